@@ -0,0 +1,14 @@
+#!/usr/bin/env python3
+"""
+Demo: Measure consumer throughput for 1..N worker processes.
+"""
+import sys
+import os
+
+# Add src to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'src'))
+
+if __name__ == "__main__":
+    # Imported (not run via runpy) so worker processes can unpickle their target
+    from src.demos.demo_scaling import main
+    main()
@@ -0,0 +1,17 @@
+#!/usr/bin/env python3
+"""
+Run a service across several worker processes (Redis consumer group scale-out).
+
+Usage:
+    python run_workers.py PaymentService --processes 4
+"""
+import sys
+import os
+
+# Add src to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'src'))
+
+if __name__ == "__main__":
+    # Imported (not run via runpy) so worker processes can unpickle their target
+    from src.workers.runner import main
+    main()
@@ -1,5 +1,14 @@
 # Event brokers package
 from .event_broker import EventBroker, broker as in_memory_broker
-from .redis_event_broker import RedisEventBroker, broker as redis_broker
+from .file_event_broker import FileEventBroker
 
-__all__ = ['EventBroker', 'RedisEventBroker', 'in_memory_broker', 'redis_broker']
+__all__ = ['EventBroker', 'RedisEventBroker', 'FileEventBroker', 'in_memory_broker', 'redis_broker']
+
+
+def __getattr__(name):
+    # The Redis broker connects when its module is imported, so it is only
+    # loaded when asked for; the other brokers work without Redis.
+    if name in ('RedisEventBroker', 'redis_broker'):
+        from . import redis_event_broker
+        return redis_event_broker.RedisEventBroker if name == 'RedisEventBroker' else redis_event_broker.broker
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -1,26 +1,46 @@
 # event_broker.py
-from collections import defaultdict
 from typing import Callable, Any
+from .middleware import DedicatedWorker, HandlerContext, HandlerMiddleware, HandlerPipeline
+from .routing import TopicRouter
 
 class EventBroker:
     def __init__(self):
         print("Event Broker initialized.")
-        self._subscribers = defaultdict(list)
+        self._subscribers = TopicRouter()
+        self._pipeline = HandlerPipeline()
+
+    def use(self, middleware: HandlerMiddleware):
+        """Thêm một middleware bao quanh mọi lần gọi callback (xem middleware.py)."""
+        self._pipeline.use(middleware)
 
     def subscribe(self, event_type: str, callback: Callable):
-        """Đăng ký một hàm callback để lắng nghe một loại sự kiện."""
+        """
+        Đăng ký một hàm callback để lắng nghe một loại sự kiện.
+        `event_type` có thể là pattern, ví dụ 'Payment*' hoặc '*.Failed'.
+        """
         print(f"New subscription: {callback.__qualname__} is listening for '{event_type}'")
-        self._subscribers[event_type].append(callback)
+        self._subscribers.add(event_type, callback)
 
     def publish(self, event_type: str, data: Any):
         """Phát một sự kiện đến tất cả những người đã đăng ký."""
         print(f"\n📢 Publishing event '{event_type}' with data: {data}")
-        if event_type in self._subscribers:
-            for callback in self._subscribers[event_type]:
-                try:
-                    callback(data)
-                except Exception as e:
-                    print(f"Error calling callback {callback.__qualname__}: {e}")
+        context = HandlerContext(event_type=event_type)
+        for callback in self._subscribers.match(event_type):
+            try:
+                if isinstance(callback, DedicatedWorker):
+                    callback.submit(data, context)
+                else:
+                    self._pipeline.invoke(callback, data, context)
+            except Exception as e:
+                print(f"Error calling callback {callback.__qualname__}: {e}")
+
+    def isolate_handler(self, callback: Callable, context: HandlerContext):
+        """Chuyển một callback chậm sang thread riêng để không chặn các callback khác."""
+        topics = self._subscribers.remove(callback)
+        worker = DedicatedWorker(callback, self._pipeline)
+        for topic in topics:
+            self._subscribers.add(topic, worker)
+        return True
 
 # Tạo một instance duy nhất để toàn bộ hệ thống sử dụng
 broker = EventBroker()
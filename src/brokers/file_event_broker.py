@@ -0,0 +1,644 @@
+# file_event_broker.py
+"""
+Event Broker backed by local append-only log files.
+
+Gives persistence and replay without running Redis (edge deployments, tests).
+Same API as RedisEventBroker: publish / subscribe / replay_events /
+get_event_history / get_stream_info / close.
+
+On-disk layout (one directory per event type):
+
+    <data_dir>/
+        checkpoints.json                  consumer-group offsets
+        AuctionEnded/
+            00000000000000000000.log      records with offsets 0..n
+            00000000000000000000.index    sparse (offset, position) entries
+            00000000000000104857.log      next segment, named by its first offset
+            ...
+
+Each record is a fixed header (offset, length, crc32, timestamp) followed by
+the JSON payload. Every `index_interval` bytes an index entry is written, so
+a read from any offset is a bisect in the index plus a short forward scan.
+Reads go through mmap and slice the mapped pages directly instead of issuing
+read() calls.
+"""
+
+import json
+import mmap
+import os
+import struct
+import threading
+import time
+import zlib
+from array import array
+from bisect import bisect_right
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from .middleware import HandlerContext, HandlerMiddleware, HandlerPipeline, handler_name
+from .routing import TopicRouter, is_pattern, topic_matches
+from .serialization import serialize_event, reconstruct_event
+
+# offset (u64), payload length (u32), crc32 of payload (u32), timestamp (f64)
+RECORD_HEADER = struct.Struct('<QIId')
+# offset (u64), byte position in the .log file (u64)
+INDEX_ENTRY = struct.Struct('<QQ')
+
+FSYNC_POLICIES = ('always', 'batch', 'never')
+
+
+class _Segment:
+    """One .log file plus its sparse in-memory index."""
+
+    def __init__(self, directory: str, base_offset: int):
+        self.base_offset = base_offset
+        name = f"{base_offset:020d}"
+        self.log_path = os.path.join(directory, name + '.log')
+        self.index_path = os.path.join(directory, name + '.index')
+
+        # Sparse index: index_offsets[i] is stored at byte index_positions[i]
+        self.index_offsets = array('Q')
+        self.index_positions = array('Q')
+        self.size = 0              # bytes of complete records
+        self.next_offset = base_offset
+        self._last_indexed = -1    # position of the newest index entry
+
+        self._log_file = None
+        self._index_file = None
+        self._map: Optional[mmap.mmap] = None
+        self._map_lock = threading.Lock()
+
+    # -- writing -----------------------------------------------------------
+
+    def open_for_append(self):
+        self._log_file = open(self.log_path, 'ab')
+        self._index_file = open(self.index_path, 'ab')
+
+    def append(self, offset: int, payload: bytes, timestamp: float, index_interval: int):
+        if self._last_indexed < 0 or self.size - self._last_indexed >= index_interval:
+            self._index_file.write(INDEX_ENTRY.pack(offset, self.size))
+            self.index_offsets.append(offset)
+            self.index_positions.append(self.size)
+            self._last_indexed = self.size
+
+        self._log_file.write(RECORD_HEADER.pack(offset, len(payload), zlib.crc32(payload), timestamp))
+        self._log_file.write(payload)
+        self.size += RECORD_HEADER.size + len(payload)
+        self.next_offset = offset + 1
+
+    def flush(self):
+        """Hand buffered writes to the OS, which makes them visible to mmap readers."""
+        self._log_file.flush()
+        self._index_file.flush()
+
+    def fsync(self):
+        self.flush()
+        os.fsync(self._log_file.fileno())
+        os.fsync(self._index_file.fileno())
+
+    def close_for_append(self):
+        if self._log_file is not None:
+            self.fsync()
+            self._log_file.close()
+            self._index_file.close()
+            self._log_file = self._index_file = None
+
+    # -- recovery ----------------------------------------------------------
+
+    def load(self):
+        """Load the index and find the end of the log, dropping a torn tail."""
+        raw = b''
+        if os.path.exists(self.index_path):
+            with open(self.index_path, 'rb') as f:
+                raw = f.read()
+            for offset, position in INDEX_ENTRY.iter_unpack(raw[:len(raw) - len(raw) % INDEX_ENTRY.size]):
+                self.index_offsets.append(offset)
+                self.index_positions.append(position)
+
+        file_size = os.path.getsize(self.log_path) if os.path.exists(self.log_path) else 0
+
+        # Scan forward from the newest index entry that lies inside the file
+        while self.index_positions and self.index_positions[-1] >= file_size:
+            self.index_offsets.pop()
+            self.index_positions.pop()
+        position = self.index_positions[-1] if self.index_positions else 0
+        expected = self.index_offsets[-1] if self.index_offsets else self.base_offset
+
+        if file_size:
+            with open(self.log_path, 'rb') as f:
+                data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+                try:
+                    while position + RECORD_HEADER.size <= file_size:
+                        offset, length, crc, _ = RECORD_HEADER.unpack_from(data, position)
+                        end = position + RECORD_HEADER.size + length
+                        if offset != expected or end > file_size or zlib.crc32(data[position + RECORD_HEADER.size:end]) != crc:
+                            break
+                        position = end
+                        expected += 1
+                finally:
+                    data.close()
+
+        if position < file_size:
+            print(f"⚠️  Truncating torn tail of {self.log_path} at byte {position}")
+            with open(self.log_path, 'r+b') as f:
+                f.truncate(position)
+
+        # Drop index entries that point into the truncated tail
+        indexed = len(self.index_offsets)
+        while self.index_positions and self.index_positions[-1] >= position:
+            self.index_offsets.pop()
+            self.index_positions.pop()
+        if len(self.index_offsets) != indexed or len(raw) != indexed * INDEX_ENTRY.size:
+            with open(self.index_path, 'wb') as f:
+                f.write(b''.join(INDEX_ENTRY.pack(offset, pos)
+                                 for offset, pos in zip(self.index_offsets, self.index_positions)))
+
+        self.size = position
+        self.next_offset = expected
+        self._last_indexed = self.index_positions[-1] if self.index_positions else -1
+
+    # -- reading -----------------------------------------------------------
+
+    def _mapped(self, size: int) -> mmap.mmap:
+        """Mapping that covers at least `size` bytes (remapped as the file grows)."""
+        with self._map_lock:
+            if self._map is None or len(self._map) < size:
+                with open(self.log_path, 'rb') as f:
+                    # Older mappings are left to the GC: slices handed out may still use them
+                    self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            return self._map
+
+    def read(self, from_offset: int, end: int) -> Iterator[Tuple[int, float, memoryview]]:
+        """Yield (offset, timestamp, payload view) for records >= from_offset below byte `end`."""
+        if end == 0:
+            return
+        i = bisect_right(self.index_offsets, from_offset) - 1
+        position = self.index_positions[i] if i >= 0 else 0
+        view = memoryview(self._mapped(end))
+
+        while position + RECORD_HEADER.size <= end:
+            offset, length, _, timestamp = RECORD_HEADER.unpack_from(view, position)
+            start = position + RECORD_HEADER.size
+            position = start + length
+            if offset >= from_offset:
+                yield offset, timestamp, view[start:position]
+
+    def close(self):
+        self.close_for_append()
+        with self._map_lock:
+            if self._map is not None:
+                try:
+                    self._map.close()
+                except BufferError:
+                    pass  # a caller still holds a view; the GC will unmap it
+                self._map = None
+
+
+class EventLog:
+    """
+    Segmented append-only log for one event type.
+
+    Args:
+        directory: Directory holding this log's segments
+        segment_bytes: Size after which a new segment is started
+        index_interval: Bytes of log between two sparse index entries
+        fsync_policy: 'always' (fsync every append), 'batch' (fsync every
+            `fsync_batch` appends or `fsync_interval` seconds) or 'never'
+            (leave it to the OS)
+    """
+
+    def __init__(self, directory: str, segment_bytes: int = 64 * 1024 * 1024,
+                 index_interval: int = 4096, fsync_policy: str = 'batch',
+                 fsync_batch: int = 1000, fsync_interval: float = 1.0):
+        if fsync_policy not in FSYNC_POLICIES:
+            raise ValueError(f"fsync_policy must be one of {FSYNC_POLICIES}")
+        self.directory = directory
+        self.segment_bytes = segment_bytes
+        self.index_interval = index_interval
+        self.fsync_policy = fsync_policy
+        self.fsync_batch = fsync_batch
+        self.fsync_interval = fsync_interval
+
+        self._lock = threading.Lock()
+        # Notified on every append; consumer threads wait on it
+        self.appended = threading.Condition(self._lock)
+        self._unsynced = 0
+        self._last_sync = time.monotonic()
+        self._closed = False
+
+        os.makedirs(directory, exist_ok=True)
+        bases = sorted(int(name[:-4]) for name in os.listdir(directory) if name.endswith('.log'))
+        self._segments: List[_Segment] = [_Segment(directory, base) for base in bases or [0]]
+        self._bases = [segment.base_offset for segment in self._segments]
+
+        active = self._segments[-1]
+        active.load()
+        for segment in self._segments[:-1]:
+            segment.load()
+        active.open_for_append()
+
+    @property
+    def next_offset(self) -> int:
+        return self._segments[-1].next_offset
+
+    @property
+    def first_offset(self) -> int:
+        return self._segments[0].base_offset
+
+    @property
+    def segment_count(self) -> int:
+        return len(self._segments)
+
+    def append(self, payload: bytes) -> int:
+        """Append one record and return its offset."""
+        with self._lock:
+            active = self._segments[-1]
+            if active.size and active.size + RECORD_HEADER.size + len(payload) > self.segment_bytes:
+                active.close_for_append()
+                active = _Segment(self.directory, active.next_offset)
+                active.open_for_append()
+                self._segments.append(active)
+                self._bases.append(active.base_offset)
+
+            offset = active.next_offset
+            active.append(offset, payload, time.time(), self.index_interval)
+
+            self._unsynced += 1
+            if self.fsync_policy == 'always':
+                self._sync_locked(active)
+            elif self.fsync_policy == 'batch' and (
+                    self._unsynced >= self.fsync_batch
+                    or time.monotonic() - self._last_sync >= self.fsync_interval):
+                self._sync_locked(active)
+            else:
+                active.flush()
+
+            self.appended.notify_all()
+            return offset
+
+    def _sync_locked(self, active: _Segment):
+        active.fsync()
+        self._unsynced = 0
+        self._last_sync = time.monotonic()
+
+    def sync(self):
+        """fsync pending appends (used by the batch policy's timer and on close)."""
+        with self._lock:
+            if not self._closed and self._unsynced and self.fsync_policy != 'never':
+                self._sync_locked(self._segments[-1])
+
+    def read(self, from_offset: int = 0, count: Optional[int] = None) -> Iterator[Tuple[int, float, memoryview]]:
+        """Yield up to `count` records starting at `from_offset`, without scanning from the start."""
+        # Segments are only ever appended, so their number taken under the lock
+        # bounds a consistent prefix of _segments and _bases without copying them
+        with self._lock:
+            n = len(self._segments)
+            active_size = self._segments[-1].size
+        segments, bases = self._segments, self._bases
+        from_offset = max(from_offset, bases[0])
+
+        i = max(bisect_right(bases, from_offset, 0, n) - 1, 0)
+        for k in range(i, n):
+            segment = segments[k]
+            end = active_size if k == n - 1 else segment.size
+            for record in segment.read(from_offset, end):
+                if count is not None and count <= 0:
+                    return
+                yield record
+                if count is not None:
+                    count -= 1
+
+    def close(self):
+        """Flush and close every segment; later calls and sync() do nothing."""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            for segment in self._segments:
+                segment.close()
+
+
+class _Checkpoints:
+    """Consumer-group offsets kept in a small JSON file, replaced atomically."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._offsets: Dict[str, Dict[str, int]] = {}
+        if os.path.exists(path):
+            with open(path) as f:
+                self._offsets = json.load(f)
+
+    def get(self, consumer_group: str, event_type: str) -> int:
+        with self._lock:
+            return self._offsets.get(consumer_group, {}).get(event_type, 0)
+
+    def groups(self, event_type: str) -> int:
+        with self._lock:
+            return sum(1 for offsets in self._offsets.values() if event_type in offsets)
+
+    def commit(self, consumer_group: str, event_type: str, next_offset: int):
+        with self._lock:
+            self._offsets.setdefault(consumer_group, {})[event_type] = next_offset
+            tmp_path = self.path + '.tmp'
+            with open(tmp_path, 'w') as f:
+                json.dump(self._offsets, f)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.path)
+
+
+class FileEventBroker:
+    """
+    Event Broker using local segmented append-only logs for persistence.
+
+    Features:
+    - Persistent event storage without an external server
+    - Replay from any offset through a sparse index and mmap reads
+    - Consumer groups with offsets in a checkpoint file
+    - Configurable fsync policy ('always', 'batch', 'never')
+    - Wildcard subscriptions and handler middleware like the other brokers
+    """
+
+    def __init__(self, data_dir: str = 'event_log', segment_bytes: int = 64 * 1024 * 1024,
+                 index_interval: int = 4096, fsync_policy: str = 'batch',
+                 fsync_batch: int = 1000, fsync_interval: float = 1.0):
+        print(f"📁 Opening file event log at '{data_dir}'...")
+        self.data_dir = data_dir
+        self._log_options = dict(
+            segment_bytes=segment_bytes,
+            index_interval=index_interval,
+            fsync_policy=fsync_policy,
+            fsync_batch=fsync_batch,
+            fsync_interval=fsync_interval
+        )
+        if fsync_policy not in FSYNC_POLICIES:
+            raise ValueError(f"fsync_policy must be one of {FSYNC_POLICIES}")
+        os.makedirs(data_dir, exist_ok=True)
+
+        self._logs: Dict[str, EventLog] = {}
+        self._checkpoints = _Checkpoints(os.path.join(data_dir, 'checkpoints.json'))
+        self._subscribers: Dict[str, TopicRouter] = {}
+        self._consumer_threads: Dict[str, threading.Thread] = {}
+        self._patterns: List[tuple] = []  # (pattern, consumer_group)
+        self._lock = threading.RLock()
+        self._running = True
+        # Set by close() to stop the flusher without waiting out its interval
+        self._stop = threading.Event()
+        self._pipeline = HandlerPipeline()
+
+        # Existing logs are opened eagerly so their size is known
+        for name in sorted(os.listdir(data_dir)):
+            if os.path.isdir(os.path.join(data_dir, name)):
+                self._log(name)
+
+        self._flusher = None
+        if fsync_policy == 'batch':
+            self._flusher = threading.Thread(target=self._flush_loop, args=(fsync_interval,),
+                                             daemon=True, name="EventLogFlusher")
+            self._flusher.start()
+        print("✅ File Event Broker initialized successfully.")
+
+    def use(self, middleware: HandlerMiddleware):
+        """Add a middleware around every handler call (see middleware.py)."""
+        self._pipeline.use(middleware)
+
+    def _log(self, event_type: str, create: bool = True) -> Optional[EventLog]:
+        """The log of an event type, opened (or created) on first use."""
+        log = self._logs.get(event_type)
+        if log is not None or not create:
+            return log
+        if not event_type or os.sep in event_type or event_type.startswith('.'):
+            raise ValueError(f"Invalid event type for a file log: '{event_type}'")
+
+        with self._lock:
+            if event_type not in self._logs:
+                self._logs[event_type] = EventLog(os.path.join(self.data_dir, event_type), **self._log_options)
+                # A new log may match existing pattern subscriptions
+                for pattern, consumer_group in self._patterns:
+                    if topic_matches(pattern, event_type):
+                        self._ensure_consumer(event_type, consumer_group)
+            return self._logs[event_type]
+
+    def subscribe(self, event_type: str, callback: Callable, consumer_group: str = "default"):
+        """
+        Subscribe to an event type with a callback function.
+
+        Args:
+            event_type: The type of event to listen for, or a pattern such as 'Payment*'
+            callback: Function to call when event is received
+            consumer_group: Consumer group name; each group keeps its own offset
+        """
+        print(f"📝 New subscription: {callback.__qualname__} is listening for '{event_type}' in group '{consumer_group}'")
+
+        with self._lock:
+            if consumer_group not in self._subscribers:
+                self._subscribers[consumer_group] = TopicRouter()
+            self._subscribers[consumer_group].add(event_type, callback)
+
+            if is_pattern(event_type):
+                self._patterns.append((event_type, consumer_group))
+                for existing in list(self._logs):
+                    if topic_matches(event_type, existing):
+                        self._ensure_consumer(existing, consumer_group)
+            else:
+                self._log(event_type)
+                self._ensure_consumer(event_type, consumer_group)
+
+    def _ensure_consumer(self, event_type: str, consumer_group: str):
+        thread_key = f"{event_type}:{consumer_group}"
+        with self._lock:
+            if thread_key in self._consumer_threads:
+                return
+            thread = threading.Thread(
+                target=self._consume_events,
+                args=(event_type, consumer_group),
+                daemon=True,
+                name=f"Consumer-{thread_key}"
+            )
+            self._consumer_threads[thread_key] = thread
+        thread.start()
+
+    def publish(self, event_type: str, data: Any) -> int:
+        """
+        Append an event to the log of its type.
+
+        Args:
+            event_type: The type of event
+            data: Event data (will be serialized to JSON)
+
+        Returns:
+            The offset of the event in its log
+        """
+        event_data = serialize_event(data)
+        offset = self._log(event_type).append(json.dumps(event_data, default=str).encode())
+
+        print(f"\n📢 Published event '{event_type}' to file log (offset: {offset})")
+        print(f"   Data: {event_data}")
+
+        return offset
+
+    def _consume_events(self, event_type: str, consumer_group: str, batch_size: int = 100):
+        """
+        Background thread that tails a log from the group's checkpoint.
+        """
+        log = self._log(event_type)
+        offset = self._checkpoints.get(consumer_group, event_type)
+
+        print(f"🎧 Started consumer for '{event_type}' in group '{consumer_group}' at offset {offset}")
+
+        while self._running:
+            with log.appended:
+                if log.next_offset <= offset:
+                    log.appended.wait(timeout=1.0)
+            if log.next_offset <= offset:
+                continue
+
+            try:
+                for event_offset, _, payload in log.read(offset, batch_size):
+                    self._process_event(event_type, event_offset, payload, consumer_group)
+                    offset = event_offset + 1
+                self._checkpoints.commit(consumer_group, event_type, offset)
+            except Exception as e:
+                print(f"❌ Error in consumer thread for '{event_type}': {e}")
+                time.sleep(1)  # Back off on error
+
+    def _process_event(self, event_type: str, offset: int, payload: memoryview, consumer_group: str):
+        """Deliver a single event to the group's subscribers."""
+        try:
+            event = reconstruct_event(json.loads(bytes(payload)))
+        except Exception as e:
+            print(f"❌ Error decoding event {event_type}@{offset}: {e}")
+            return
+
+        context = HandlerContext(event_type, offset, consumer_group)
+        for callback in self._subscribers[consumer_group].match(event_type):
+            try:
+                self._pipeline.invoke(callback, event, context)
+            except Exception as e:
+                print(f"❌ Error calling callback {callback.__qualname__}: {e}")
+
+    def isolate_handler(self, callback: Callable, context: HandlerContext) -> bool:
+        """
+        Move a slow handler to a consumer group of its own.
+
+        The handler is removed from its group and re-subscribed in
+        '<group>.isolated.<handler>', whose offsets start where the original
+        group is, so it gets its own consumer thread without skipping events.
+        """
+        old_group = context.consumer_group
+        new_group = f"{old_group}.isolated.{handler_name(callback)}"
+
+        for topic in self._subscribers[old_group].remove(callback):
+            event_types = [name for name in list(self._logs) if topic_matches(topic, name)] if is_pattern(topic) else [topic]
+            for event_type in event_types:
+                if event_type == context.event_type:
+                    start = context.event_id + 1
+                else:
+                    start = self._checkpoints.get(old_group, event_type)
+                self._checkpoints.commit(new_group, event_type, start)
+
+            self.subscribe(topic, callback, consumer_group=new_group)
+        return True
+
+    def get_event_history(self, event_type: str, count: int = 10) -> List[Dict]:
+        """
+        Retrieve the latest events of a type, newest first.
+
+        Args:
+            event_type: The type of event
+            count: Number of events to retrieve
+
+        Returns:
+            List of events with their offsets and data
+        """
+        log = self._log(event_type, create=False)
+        if log is None:
+            return []
+
+        start = max(log.next_offset - count, log.first_offset)
+        history = [
+            {'id': offset, 'type': event_type, 'data': json.loads(bytes(payload))}
+            for offset, _, payload in log.read(start, count)
+        ]
+        history.reverse()
+        return history
+
+    def replay_events(self, event_type: str, from_id: int = 0, count: Optional[int] = None):
+        """
+        Replay events from a specific offset in the log.
+
+        Args:
+            event_type: The type of event to replay
+            from_id: Starting offset (default: from beginning)
+            count: Maximum number of events to replay (None = all)
+        """
+        print(f"\n🔄 Replaying events from '{event_type}' starting from offset '{from_id}'...")
+
+        log = self._log(event_type, create=False)
+        if log is None:
+            print("✅ Replayed 0 events")
+            return
+
+        # Every subscriber of the event type, whatever its group, gets the replay once
+        callbacks = []
+        for router in list(self._subscribers.values()):
+            for callback in router.match(event_type):
+                if callback not in callbacks:
+                    callbacks.append(callback)
+
+        replayed = 0
+        for offset, _, payload in log.read(int(from_id), count):
+            data = json.loads(bytes(payload))
+            print(f"  📼 Replaying event {offset}: {data}")
+
+            context = HandlerContext(event_type, offset, replay=True)
+            for callback in callbacks:
+                try:
+                    self._pipeline.invoke(callback, reconstruct_event(data), context)
+                except Exception as e:
+                    print(f"❌ Error in replay callback {callback.__qualname__}: {e}")
+
+            replayed += 1
+
+        print(f"✅ Replayed {replayed} events")
+
+    def get_stream_info(self, event_type: str) -> Dict:
+        """Get information about the log of an event type."""
+        log = self._log(event_type, create=False)
+        if log is None or log.next_offset == log.first_offset:
+            return {'length': 0, 'error': 'Stream does not exist'}
+
+        first = next(log.read(log.first_offset, 1))
+        last = next(log.read(log.next_offset - 1, 1))
+        return {
+            'length': log.next_offset - log.first_offset,
+            'first_entry': (first[0], json.loads(bytes(first[2]))),
+            'last_entry': (last[0], json.loads(bytes(last[2]))),
+            'groups': self._checkpoints.groups(event_type),
+            'segments': log.segment_count
+        }
+
+    def _flush_loop(self, interval: float):
+        """fsync batches that didn't fill up within the interval."""
+        while not self._stop.wait(interval):
+            for log in list(self._logs.values()):
+                try:
+                    log.sync()
+                except Exception as e:
+                    print(f"❌ Error syncing event log: {e}")
+
+    def close(self):
+        """Close the broker and cleanup resources."""
+        print("\n🔌 Closing File Event Broker...")
+        self._running = False
+        self._stop.set()
+
+        # Wait for consumer threads and the flusher to finish
+        for thread in list(self._consumer_threads.values()):
+            thread.join(timeout=2)
+        if self._flusher is not None:
+            self._flusher.join()
+
+        for log in self._logs.values():
+            log.close()
+        print("✅ File Event Broker closed.")
@@ -0,0 +1,268 @@
+# middleware.py
+"""
+Middleware chain around handler invocation.
+
+Every broker calls its subscribers through a HandlerPipeline. Middlewares
+wrap each call and can observe or change it:
+
+    from src.brokers.middleware import SlowHandlerDetector, SamplingProfiler, IsolationPolicy
+
+    detector = SlowHandlerDetector(budget_ms=50, on_slow=IsolationPolicy(broker))
+    profiler = SamplingProfiler()
+    broker.use(detector)
+    broker.use(profiler)
+
+    profiler.profile("PaymentService.handle_auction_ended", sample_rate=0.05)
+    ...
+    print(profiler.report("PaymentService.handle_auction_ended"))
+    print(detector.stats())
+
+A middleware is any object with `__call__(callback, event, context, call_next)`
+that calls `call_next()` to continue the chain.
+"""
+
+import cProfile
+import io
+import pstats
+import queue
+import random
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional
+
+
+@dataclass
+class HandlerContext:
+    """Where the event being handled comes from."""
+    event_type: str
+    event_id: Any = None
+    consumer_group: Optional[str] = None
+    # True for replay_events(): handlers are measured but never isolated
+    replay: bool = False
+
+
+def handler_name(callback: Callable) -> str:
+    return getattr(callback, '__qualname__', repr(callback))
+
+
+class HandlerMiddleware:
+    """Base class: passes the call through unchanged."""
+
+    def __call__(self, callback: Callable, event: Any, context: HandlerContext, call_next: Callable):
+        return call_next()
+
+
+class HandlerPipeline:
+    """Ordered middleware chain; the first middleware added is the outermost."""
+
+    def __init__(self):
+        self._middlewares: List[HandlerMiddleware] = []
+
+    def use(self, middleware: HandlerMiddleware):
+        self._middlewares = self._middlewares + [middleware]
+
+    def invoke(self, callback: Callable, event: Any, context: HandlerContext):
+        middlewares = self._middlewares
+        if not middlewares:
+            return callback(event)
+
+        def call(i: int):
+            if i == len(middlewares):
+                return callback(event)
+            return middlewares[i](callback, event, context, lambda: call(i + 1))
+
+        return call(0)
+
+
+class TimingMiddleware(HandlerMiddleware):
+    """Keeps the latest `window` durations of every handler."""
+
+    def __init__(self, window: int = 1000):
+        self.window = window
+        self._durations: Dict[str, deque] = {}
+        self._counts: Dict[str, int] = {}
+
+    def __call__(self, callback, event, context, call_next):
+        start = time.perf_counter()
+        try:
+            return call_next()
+        finally:
+            self.record(callback, context, (time.perf_counter() - start) * 1000)
+
+    def record(self, callback: Callable, context: HandlerContext, duration_ms: float):
+        name = handler_name(callback)
+        durations = self._durations.get(name)
+        if durations is None:
+            durations = self._durations.setdefault(name, deque(maxlen=self.window))
+        durations.append(duration_ms)
+        self._counts[name] = self._counts.get(name, 0) + 1
+
+    def percentile(self, name: str, q: float) -> Optional[float]:
+        """q-th percentile (0-100) of a handler's recent durations in ms."""
+        durations = sorted(self._durations.get(name, ()))
+        if not durations:
+            return None
+        return durations[min(len(durations) - 1, int(len(durations) * q / 100))]
+
+    def stats(self) -> Dict[str, Dict]:
+        """Count and latency percentiles (ms) per handler."""
+        return {
+            name: {
+                'count': self._counts[name],
+                'p50': self.percentile(name, 50),
+                'p99': self.percentile(name, 99),
+                'max': max(durations)
+            }
+            for name, durations in list(self._durations.items()) if durations
+        }
+
+
+class SlowHandlerDetector(TimingMiddleware):
+    """
+    Flags handlers whose p99 latency exceeds a budget.
+
+    The p99 is re-evaluated every `check_every` calls once a handler has
+    `min_samples` measurements. `on_slow` is then called with (callback,
+    context, p99_ms) and the handler is flagged unless the hook returns False
+    (e.g. a declined isolation, retried at the next check). Replayed calls are timed but never
+    trigger a check, so a handler is only flagged on live traffic.
+    """
+
+    def __init__(self, budget_ms: float, window: int = 1000, min_samples: int = 100,
+                 check_every: int = 50, on_slow: Optional[Callable] = None):
+        super().__init__(window)
+        self.budget_ms = budget_ms
+        self.min_samples = min_samples
+        self.check_every = check_every
+        self.on_slow = on_slow
+        self.flagged: Dict[str, float] = {}
+
+    def record(self, callback, context, duration_ms):
+        super().record(callback, context, duration_ms)
+        if context.replay:
+            return
+        name = handler_name(callback)
+        count = self._counts[name]
+        if name in self.flagged or count < self.min_samples or count % self.check_every:
+            return
+
+        p99 = self.percentile(name, 99)
+        if p99 > self.budget_ms:
+            print(f"🐢 Slow handler {name}: p99 {p99:.1f}ms exceeds budget {self.budget_ms:.1f}ms")
+            handled = None
+            if self.on_slow is not None:
+                try:
+                    handled = self.on_slow(callback, context, p99)
+                except Exception as e:
+                    print(f"❌ Error in slow handler hook for {name}: {e}")
+            if handled is not False:
+                self.flagged[name] = p99
+
+
+class SamplingProfiler(HandlerMiddleware):
+    """
+    Captures cProfile data for a sample of calls to selected handlers.
+
+    Profiling is switched on and off at runtime with profile()/stop(); calls
+    of other handlers pay only a dict lookup.
+    """
+
+    def __init__(self):
+        self._sample_rates: Dict[str, float] = {}
+        self._stats: Dict[str, pstats.Stats] = {}
+        self._lock = threading.Lock()
+
+    def profile(self, name: str, sample_rate: float = 0.01):
+        """Start profiling `sample_rate` of the calls to the handler `name`."""
+        self._sample_rates[name] = sample_rate
+
+    def stop(self, name: str):
+        self._sample_rates.pop(name, None)
+
+    def __call__(self, callback, event, context, call_next):
+        sample_rate = self._sample_rates.get(handler_name(callback))
+        if sample_rate is None or random.random() >= sample_rate:
+            return call_next()
+
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError:
+            # Only one profiler may be active at a time; skip this sample
+            return call_next()
+        try:
+            return call_next()
+        finally:
+            profiler.disable()
+            self._add(handler_name(callback), profiler)
+
+    def _add(self, name: str, profiler: cProfile.Profile):
+        with self._lock:
+            if name in self._stats:
+                self._stats[name].add(profiler)
+            else:
+                self._stats[name] = pstats.Stats(profiler)
+
+    def report(self, name: str, sort_by: str = 'cumulative', limit: int = 20) -> str:
+        """Text report of the samples captured for a handler."""
+        with self._lock:
+            stats = self._stats.get(name)
+            if stats is None:
+                return f"No samples for {name}"
+            output = io.StringIO()
+            stats.stream = output
+            stats.sort_stats(sort_by).print_stats(limit)
+        return output.getvalue()
+
+    def dump(self, name: str, path: str):
+        """Write the samples of a handler to a .prof file (snakeviz, pstats)."""
+        with self._lock:
+            self._stats[name].dump_stats(path)
+
+
+class IsolationPolicy:
+    """
+    `on_slow` hook that moves a flagged handler to its own worker.
+
+    The broker decides what a dedicated worker is (see `isolate_handler` on
+    each broker): a worker thread with its own queue in memory, or a separate
+    consumer group with its own consumer thread for the persistent brokers.
+    Either way the slow handler stops delaying the other subscribers.
+    Returns False when the broker declined, so the detector checks again later.
+    """
+
+    def __init__(self, broker):
+        self.broker = broker
+
+    def __call__(self, callback: Callable, context: HandlerContext, p99_ms: float) -> bool:
+        if context.replay:
+            return False
+        isolated = self.broker.isolate_handler(callback, context)
+        if isolated:
+            print(f"🚧 Isolated {handler_name(callback)} on a dedicated worker")
+        return isolated
+
+
+class DedicatedWorker:
+    """Thread with its own queue that runs one handler."""
+
+    def __init__(self, callback: Callable, pipeline: HandlerPipeline, maxsize: int = 10000):
+        self.callback = callback
+        self.pipeline = pipeline
+        self.__qualname__ = f"isolated({handler_name(callback)})"
+        self._queue: queue.Queue = queue.Queue(maxsize=maxsize)
+        self._thread = threading.Thread(target=self._run, daemon=True, name=f"Isolated-{handler_name(callback)}")
+        self._thread.start()
+
+    def submit(self, event: Any, context: HandlerContext):
+        self._queue.put((event, context))
+
+    def _run(self):
+        while True:
+            event, context = self._queue.get()
+            try:
+                self.pipeline.invoke(self.callback, event, context)
+            except Exception as e:
+                print(f"Error calling callback {handler_name(self.callback)}: {e}")
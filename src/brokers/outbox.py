@@ -0,0 +1,209 @@
+# outbox.py
+"""
+Transactional outbox for RedisEventBroker.
+
+In outbox mode `publish` only appends the event to a local SQLite table
+(WAL journal), which takes microseconds and never touches the network.
+An `OutboxRelay` thread drains the table into Redis with large pipelined
+XADD batches and deletes rows only after Redis accepted them:
+
+- at-least-once: a crash between XADD and DELETE re-sends the batch, so
+  every entry carries a `dedup_id` that consumers use to skip duplicates
+- Redis outages: rows stay on disk and the relay retries with backoff
+"""
+
+import json
+import sqlite3
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+from redis.exceptions import ConnectionError as RedisConnectionError, ResponseError, TimeoutError as RedisTimeoutError
+from .pools import PoolExhaustedError
+from .resilience import CircuitBreaker, CircuitOpenError, ExponentialBackoff
+
+
+def _is_rejected_id(error: Exception) -> bool:
+    """True for XADD errors caused by the explicit entry ID itself."""
+    message = str(error)
+    return isinstance(error, ResponseError) and (
+        'equal or smaller than the target stream top item' in message
+        or 'Invalid stream ID' in message
+    )
+
+
+class SQLiteOutbox:
+    """Append-only outbox table stored in a local SQLite database."""
+
+    def __init__(self, path: str = "outbox.db"):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = self._connect()
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS outbox (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                stream_key TEXT NOT NULL,
+                event_id TEXT,
+                fields TEXT NOT NULL,
+                created_at REAL NOT NULL
+            )
+            """
+        )
+
+    def _connect(self) -> sqlite3.Connection:
+        # isolation_level=None: every statement commits on its own
+        conn = sqlite3.connect(self.path, isolation_level=None, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        # With WAL, NORMAL survives application crashes; only an OS crash may lose the last commits
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    def append(self, stream_key: str, fields: Dict[str, str], event_id: Optional[str] = None):
+        """Store one event to be relayed to `stream_key`."""
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO outbox (stream_key, event_id, fields, created_at) VALUES (?, ?, ?, ?)",
+                (stream_key, event_id, json.dumps(fields), time.time())
+            )
+
+    def fetch(self, limit: int) -> List[Tuple[int, str, Optional[str], Dict[str, str]]]:
+        """Oldest `limit` rows as (row_id, stream_key, event_id, fields)."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT id, stream_key, event_id, fields FROM outbox ORDER BY id LIMIT ?",
+                (limit,)
+            ).fetchall()
+        return [(row_id, stream_key, event_id, json.loads(fields))
+                for row_id, stream_key, event_id, fields in rows]
+
+    def delete_through(self, row_id: int):
+        """Delete every row up to and including `row_id`."""
+        with self._lock:
+            self._conn.execute("DELETE FROM outbox WHERE id <= ?", (row_id,))
+
+    def pending(self) -> int:
+        """Number of events not relayed yet."""
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM outbox").fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class OutboxRelay:
+    """
+    Background thread that moves events from a SQLiteOutbox into Redis Streams.
+
+    Args:
+        outbox: The outbox to drain
+        redis_client: Client used for the pipelined XADDs
+        batch_size: Maximum number of events per pipeline
+        idle_wait: Seconds to sleep when the outbox is empty (publish wakes it earlier)
+        max_backoff: Upper bound of the retry delay while Redis is unreachable
+        breaker: Circuit breaker shared with the broker, if any
+        registry_key: Set that every relayed stream key is added to, if any
+    """
+
+    def __init__(self, outbox: SQLiteOutbox, redis_client, batch_size: int = 500,
+                 idle_wait: float = 0.5, max_backoff: float = 30.0,
+                 breaker: Optional[CircuitBreaker] = None, registry_key: Optional[str] = None):
+        self.outbox = outbox
+        self.redis_client = redis_client
+        self.batch_size = batch_size
+        self.idle_wait = idle_wait
+        self.max_backoff = max_backoff
+        self.breaker = breaker
+        self.registry_key = registry_key
+
+        self._wakeup = threading.Event()
+        self._running = False
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._running = True
+        self._thread = threading.Thread(target=self._run, daemon=True, name="OutboxRelay")
+        self._thread.start()
+        print(f"📤 Outbox relay started (outbox: {self.outbox.path})")
+
+    def notify(self):
+        """Wake the relay up because new events were appended."""
+        self._wakeup.set()
+
+    def relay_batch(self) -> int:
+        """
+        Send one batch to Redis and remove it from the outbox.
+
+        Returns:
+            Number of rows removed from the outbox
+        """
+        rows = self.outbox.fetch(self.batch_size)
+        if not rows:
+            return 0
+        if self.breaker is not None:
+            self.breaker.check()
+
+        pipe = self.redis_client.pipeline(transaction=False)
+        for row_id, stream_key, event_id, fields in rows:
+            if event_id:
+                pipe.xadd(stream_key, fields, id=event_id)
+            else:
+                pipe.xadd(stream_key, fields)
+        if self.registry_key:
+            pipe.sadd(self.registry_key, *{stream_key for _, stream_key, _, _ in rows})
+
+        # Connection problems raise here and leave the batch on disk.
+        # Per-entry errors are retried too (READONLY during a failover, OOM,
+        # TRYAGAIN, ...), except an explicit ID Redis rejects: that can never
+        # succeed, so it is reported and the row is dropped.
+        try:
+            results = pipe.execute(raise_on_error=False)
+            for (row_id, stream_key, event_id, fields), result in zip(rows, results):
+                if isinstance(result, Exception) and not _is_rejected_id(result):
+                    raise result
+        except (RedisConnectionError, RedisTimeoutError, ResponseError) as e:
+            if self.breaker is not None and not isinstance(e, PoolExhaustedError):
+                self.breaker.record_failure()
+            raise
+        if self.breaker is not None:
+            self.breaker.record_success()
+        for (row_id, stream_key, event_id, fields), result in zip(rows, results):
+            if isinstance(result, Exception):
+                print(f"❌ Dropping outbox event {fields.get('dedup_id')} for '{stream_key}': {result}")
+
+        self.outbox.delete_through(rows[-1][0])
+        return len(rows)
+
+    def _run(self):
+        backoff = ExponentialBackoff(cap=self.max_backoff)
+        while self._running:
+            try:
+                relayed = self.relay_batch()
+                backoff.reset()
+                if relayed < self.batch_size:
+                    self._wakeup.wait(self.idle_wait)
+                    self._wakeup.clear()
+            except Exception as e:
+                delay = backoff.next_delay()
+                if not isinstance(e, CircuitOpenError):
+                    print(f"❌ Outbox relay error, retrying in {delay:.2f}s: {e}")
+                time.sleep(delay)
+
+    def flush(self, timeout: float = 10.0) -> bool:
+        """Wait until the outbox is empty. Returns False on timeout."""
+        deadline = time.monotonic() + timeout
+        while self.outbox.pending():
+            if time.monotonic() >= deadline:
+                return False
+            self.notify()
+            time.sleep(0.05)
+        return True
+
+    def stop(self):
+        self._running = False
+        self._wakeup.set()
+        if self._thread is not None:
+            self._thread.join(timeout=2)
+            self._thread = None
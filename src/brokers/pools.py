@@ -0,0 +1,93 @@
+# pools.py
+"""
+Bounded Redis connection pools that measure how long callers wait.
+
+RedisEventBroker keeps two of them: one for blocking XREADGROUP consumers,
+which hold a connection for up to the block time, and one for publishers
+and short commands, so publish latency doesn't depend on how many
+consumers are currently blocked.
+"""
+
+import threading
+import time
+from collections import deque
+from functools import partial
+from queue import LifoQueue
+from typing import Dict
+import redis
+from redis.exceptions import ConnectionError as RedisConnectionError
+
+
+class PoolExhaustedError(RedisConnectionError):
+    """No connection became free within the pool timeout; Redis itself may be healthy."""
+
+
+class PoolMetrics:
+    """Wait time to obtain a connection, over the latest `window` checkouts."""
+
+    def __init__(self, window: int = 1000):
+        self._waits = deque(maxlen=window)
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.timeouts = 0
+        self.max_wait_ms = 0.0
+
+    def record(self, wait_ms: float):
+        with self._lock:
+            self._waits.append(wait_ms)
+            self.checkouts += 1
+            self.max_wait_ms = max(self.max_wait_ms, wait_ms)
+
+    def record_timeout(self):
+        with self._lock:
+            self.timeouts += 1
+
+    def snapshot(self) -> Dict:
+        with self._lock:
+            waits = sorted(self._waits)
+        return {
+            'checkouts': self.checkouts,
+            'timeouts': self.timeouts,
+            'p50_wait_ms': waits[len(waits) // 2] if waits else 0.0,
+            'p99_wait_ms': waits[min(len(waits) - 1, len(waits) * 99 // 100)] if waits else 0.0,
+            'max_wait_ms': self.max_wait_ms
+        }
+
+
+class _WaitTimedQueue(LifoQueue):
+    """The pool's queue of free connections; records how long each get() waited."""
+
+    def __init__(self, metrics: PoolMetrics, maxsize: int = 0):
+        super().__init__(maxsize)
+        self.metrics = metrics
+
+    def get(self, block: bool = True, timeout: float = None):
+        start = time.perf_counter()
+        connection = super().get(block, timeout)
+        self.metrics.record((time.perf_counter() - start) * 1000)
+        return connection
+
+
+class InstrumentedConnectionPool(redis.BlockingConnectionPool):
+    """
+    BlockingConnectionPool with at most `max_connections` connections.
+
+    Callers wait up to `timeout` seconds for a free connection, then get a
+    PoolExhaustedError. Every checkout's wait for a free slot is recorded in
+    `metrics`; connecting and the readiness check are not part of it.
+    """
+
+    def __init__(self, name: str, max_connections: int, timeout: float, **connection_kwargs):
+        self.name = name
+        self.metrics = PoolMetrics()
+        super().__init__(max_connections=max_connections, timeout=timeout,
+                         queue_class=partial(_WaitTimedQueue, self.metrics), **connection_kwargs)
+
+    def get_connection(self, *args, **kwargs):
+        try:
+            return super().get_connection(*args, **kwargs)
+        except RedisConnectionError as e:
+            if 'No connection available' in str(e):
+                self.metrics.record_timeout()
+                raise PoolExhaustedError(f"No connection available in pool '{self.name}'") from e
+            raise
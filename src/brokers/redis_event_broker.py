@@ -1,11 +1,26 @@
 # redis_event_broker.py
 import json
+import os
 import threading
 import time
+import uuid
 from typing import Callable, Any, Dict, List, Optional
-from dataclasses import asdict, is_dataclass
 import redis
-from redis.exceptions import ResponseError
+from redis.backoff import FullJitterBackoff
+from redis.exceptions import ConnectionError as RedisConnectionError, ResponseError, TimeoutError as RedisTimeoutError
+from redis.retry import Retry
+from .middleware import HandlerContext, HandlerMiddleware, HandlerPipeline, handler_name
+from .outbox import SQLiteOutbox, OutboxRelay
+from .pools import InstrumentedConnectionPool, PoolExhaustedError
+from .resilience import CircuitBreaker, CircuitOpenError, ExponentialBackoff
+from .routing import TopicRouter, is_pattern, topic_matches
+from .serialization import serialize_event, reconstruct_event
+
+
+def _stream_id_key(stream_id: str) -> tuple:
+    """Sortable form of a stream ID ('5-10' -> (5, 10))."""
+    ms, seq = stream_id.split('-')
+    return int(ms), int(seq)
 
 class RedisEventBroker:
     """
@@ -15,18 +30,63 @@ class RedisEventBroker:
     - Persistent event storage
     - Event replay capability
     - Consumer groups for reliable processing
-    - Automatic reconnection
+    - Automatic reconnection with jittered exponential backoff and circuit breaking
+    - Separate bounded connection pools for blocking consumers and publishers
+    - Stable consumer names, heartbeats and rebalancing for multi-process workers
+    - Optional transactional outbox (local SQLite buffer + bulk relay)
+    - Wildcard subscriptions ('Payment*', '*.Failed') with stream discovery
+    - Middleware around handler calls (timing, profiling, slow-handler isolation)
     """
     
-    def __init__(self, redis_host: str = 'localhost', redis_port: int = 6379, redis_db: int = 0):
+    # How long consumers remember processed outbox dedup IDs
+    dedup_ttl = 24 * 3600
+    
+    # How often pattern subscriptions look for new matching streams
+    discovery_interval = 5.0
+    
+    # Set of every stream key, so discovery never has to SCAN the keyspace
+    stream_registry_key = "registry:streams"
+    
+    def __init__(self, redis_host: str = 'localhost', redis_port: int = 6379, redis_db: int = 0,
+                 consumer_name: Optional[str] = None, outbox_path: Optional[str] = None,
+                 publisher_pool_size: int = 10, consumer_pool_size: int = 64, pool_timeout: float = 5.0,
+                 failure_threshold: int = 5, reset_timeout: float = 10.0, max_backoff: float = 10.0,
+                 retries: int = 3):
+        """
+        Args:
+            publisher_pool_size: Connections for publish and other short commands
+            consumer_pool_size: Connections for consumer threads; each one holds a
+                connection while blocked in XREADGROUP, so keep this at least as
+                large as the number of subscribed (event type, group) pairs
+            pool_timeout: Seconds to wait for a free connection before failing
+            failure_threshold: Consecutive connection failures that open the circuit
+            reset_timeout: Seconds the circuit stays open before calls are retried
+            max_backoff: Upper bound of the consumers' reconnect delay
+            retries: Times a command is retried with jittered backoff after a
+                dropped connection or timeout, before the error is raised
+        """
         print(f"🔌 Connecting to Redis at {redis_host}:{redis_port}...")
-        self.redis_client = redis.Redis(
+        connection_kwargs = dict(
             host=redis_host,
             port=redis_port,
             db=redis_db,
             decode_responses=True,
-            health_check_interval=30
+            health_check_interval=30,
+            # Connections built by our own pools don't get redis-py's default Retry
+            retry=Retry(FullJitterBackoff(cap=1.0, base=0.05), retries)
+        )
+        self._publisher_pool = InstrumentedConnectionPool(
+            'publisher', max_connections=publisher_pool_size, timeout=pool_timeout, **connection_kwargs
         )
+        self._consumer_pool = InstrumentedConnectionPool(
+            'consumer', max_connections=consumer_pool_size, timeout=pool_timeout, **connection_kwargs
+        )
+        self.redis_client = redis.Redis(connection_pool=self._publisher_pool)
+        # Blocking reads and acks go through their own pool so they never starve publishers
+        self._consumer_client = redis.Redis(connection_pool=self._consumer_pool)
+        
+        self._breaker = CircuitBreaker(failure_threshold=failure_threshold, reset_timeout=reset_timeout)
+        self.max_backoff = max_backoff
         
         # Test connection
         try:
@@ -37,46 +97,305 @@ class RedisEventBroker:
             print("💡 Make sure Redis is running. Use: docker-compose up -d")
             raise
         
-        self._subscribers: Dict[str, List[Callable]] = {}
+        # Routing trie per consumer group: each group's consumer threads only
+        # call the callbacks subscribed in that group
+        self._subscribers: Dict[str, TopicRouter] = {}
         self._consumer_threads: Dict[str, threading.Thread] = {}
+        self._patterns: List[tuple] = []  # (pattern, consumer_group)
+        self._discovery_thread: Optional[threading.Thread] = None
+        # Streams this broker already added to the registry
+        self._registered_streams: set = set()
+        self._lock = threading.Lock()
+        self._pipeline = HandlerPipeline()
+        # Per consumer thread: its consumer name and the last entry whose callbacks
+        # were resolved. isolate_handler() holds _dispatch_lock to see a consistent view.
+        self._consumer_names: Dict[str, str] = {}
+        self._dispatched: Dict[str, str] = {}
+        self._dispatch_lock = threading.Lock()
+        # Entries handed to a new consumer thread before its first read (see isolate_handler)
+        self._handoff: Dict[str, List] = {}
         self._running = True
         
+        # Consumer group membership (see set_consumer_name / start_heartbeat)
+        self.consumer_name = consumer_name
+        # Token of this process's claim on consumer_name (see claim_consumer_name)
+        self._name_token: Optional[str] = None
+        self._heartbeat_thread: Optional[threading.Thread] = None
+        self._heartbeat_stop = threading.Event()
+        self._heartbeat_ttl = 10.0
+        # Set by start_heartbeat(): consumer threads then claim work of dead members
+        self._rebalance_interval: Optional[float] = None
+        self._rebalance_min_idle_ms = 30000
+        
+        # Outbox mode (see enable_outbox)
+        self._outbox: Optional[SQLiteOutbox] = None
+        self._relay: Optional[OutboxRelay] = None
+        if outbox_path:
+            self.enable_outbox(outbox_path)
+    
+    def use(self, middleware: HandlerMiddleware):
+        """Add a middleware around every handler call (see middleware.py)."""
+        self._pipeline.use(middleware)
+    
+    def enable_outbox(self, path: str = "outbox.db", batch_size: int = 500):
+        """
+        Switch publish() to outbox mode.
+        
+        Events are appended to a local SQLite outbox and a relay thread ships
+        them to Redis in pipelined batches, so publishers neither wait for nor
+        fail because of Redis. Delivery is at-least-once; duplicates are
+        filtered by consumers through the `dedup_id` field.
+        
+        Args:
+            path: SQLite database file of the outbox
+            batch_size: Maximum number of events per XADD pipeline
+        """
+        if self._outbox is not None:
+            return
+        self._outbox = SQLiteOutbox(path)
+        self._relay = OutboxRelay(self._outbox, self.redis_client, batch_size=batch_size,
+                                  breaker=self._breaker, registry_key=self.stream_registry_key)
+        self._relay.start()
+    
+    def set_consumer_name(self, consumer_name: str):
+        """
+        Use a stable consumer name for every consumer group this broker joins.
+        
+        Must be called before subscribe(). A stable name lets a restarted worker
+        pick up the pending entries it owned before it died.
+        """
+        if self._consumer_threads:
+            raise RuntimeError("set_consumer_name() must be called before subscribe()")
+        self.consumer_name = consumer_name
+    
+    def claim_consumer_name(self, consumer_name: str, token: str, ttl: float = 10.0) -> bool:
+        """
+        Take a stable consumer name unless another live process holds it.
+        
+        The claim is a 'consumer:<name>' key set with NX to `token` and a `ttl`
+        expiry, refreshed by the heartbeat. Claiming again with the same token
+        (e.g. a restarted worker of the same runner) succeeds.
+        
+        Returns:
+            True if the name is now used by this broker
+        """
+        key = self._name_claim_key(consumer_name)
+        px = int(ttl * 1000)
+        if not self.redis_client.set(key, token, nx=True, px=px):
+            if self.redis_client.get(key) != token:
+                return False
+            self.redis_client.pexpire(key, px)
+        self.set_consumer_name(consumer_name)
+        self._name_token = token
+        self._heartbeat_ttl = ttl
+        return True
+    
+    def _name_claim_key(self, consumer_name: str) -> str:
+        return f"consumer:{consumer_name}"
+    
+    def _refresh_name_claim(self):
+        key = self._name_claim_key(self.consumer_name)
+        px = int(self._heartbeat_ttl * 1000)
+        if self.redis_client.get(key) == self._name_token:
+            self.redis_client.pexpire(key, px)
+        elif not self.redis_client.set(key, self._name_token, nx=True, px=px):
+            print(f"❌ Consumer name '{self.consumer_name}' was taken over by another process")
+    
+    def _heartbeat_key(self, consumer_group: str, consumer_name: str) -> str:
+        return f"heartbeat:{consumer_group}:{consumer_name}"
+    
+    def _send_heartbeat(self, consumer_group: str):
+        self.redis_client.set(
+            self._heartbeat_key(consumer_group, self.consumer_name),
+            os.getpid(),
+            px=int(self._heartbeat_ttl * 1000)
+        )
+    
+    def start_heartbeat(self, interval: float = 2.0, ttl: float = 10.0, min_idle_ms: int = 30000):
+        """
+        Periodically announce this consumer as alive and rebalance dead members.
+        
+        Every `interval` seconds a heartbeat key with a `ttl` expiry is refreshed
+        for each consumer group joined, along with the consumer name claim if
+        any. The heartbeat thread only refreshes keys,
+        so slow handlers can't delay it. Every `interval` seconds each consumer
+        thread also calls rebalance() for its stream and processes what it claimed.
+        """
+        if not self.consumer_name:
+            raise RuntimeError("start_heartbeat() requires a stable consumer name")
+        if self._heartbeat_thread is not None:
+            return
+        self._heartbeat_ttl = ttl
+        self._rebalance_min_idle_ms = min_idle_ms
+        self._rebalance_interval = interval
+        
+        def beat():
+            while not self._heartbeat_stop.is_set():
+                try:
+                    if self._name_token is not None:
+                        self._refresh_name_claim()
+                    for consumer_group in {thread_key.rsplit(':', 1)[1] for thread_key in list(self._consumer_threads)}:
+                        self._send_heartbeat(consumer_group)
+                except Exception as e:
+                    print(f"❌ Error in heartbeat for '{self.consumer_name}': {e}")
+                self._heartbeat_stop.wait(interval)
+        
+        self._heartbeat_thread = threading.Thread(
+            target=beat,
+            daemon=True,
+            name=f"Heartbeat-{self.consumer_name}"
+        )
+        self._heartbeat_thread.start()
+    
+    def rebalance(self, event_type: str, consumer_group: str = "default", min_idle_ms: int = 30000) -> List:
+        """
+        Claim pending entries from dead members of a consumer group.
+        
+        A member is dead when its heartbeat key has expired. Its pending entries
+        idle for at least `min_idle_ms` are claimed by this consumer. The member
+        is deleted from the group only once it has not read for a full heartbeat
+        TTL and XPENDING, checked right before deleting, shows it owns nothing.
+        
+        Returns:
+            The claimed (event_id, event_data) entries; the caller processes them
+        """
+        stream_key = f"events:{event_type}"
+        claimed = []
+        
+        for consumer in self._consumer_client.xinfo_consumers(stream_key, consumer_group):
+            name = consumer['name']
+            if name == self.consumer_name:
+                continue
+            if self._consumer_client.exists(self._heartbeat_key(consumer_group, name)):
+                continue
+            
+            pending = self._consumer_client.xpending_range(
+                stream_key, consumer_group, min='-', max='+',
+                count=100, consumername=name, idle=min_idle_ms
+            )
+            if pending:
+                events = self._consumer_client.xclaim(
+                    stream_key, consumer_group, self.consumer_name,
+                    min_idle_time=min_idle_ms,
+                    message_ids=[entry['message_id'] for entry in pending]
+                )
+                claimed.extend(events)
+                print(f"♻️  Claimed {len(events)} pending events of dead consumer '{name}' on '{event_type}'")
+            
+            # 'inactive' (Redis 7.2+) is the time since the last successful read;
+            # a member that read recently may be alive with a late heartbeat
+            inactive = consumer.get('inactive')
+            if inactive is None or inactive < 0:
+                inactive = consumer['idle']
+            if inactive < self._heartbeat_ttl * 1000:
+                continue
+            if not self._consumer_client.xpending_range(
+                    stream_key, consumer_group, min='-', max='+', count=1, consumername=name):
+                self._consumer_client.xgroup_delconsumer(stream_key, consumer_group, name)
+        
+        return claimed
+    
     def subscribe(self, event_type: str, callback: Callable, consumer_group: str = "default"):
         """
         Subscribe to an event type with a callback function.
         
         Args:
-            event_type: The type of event to listen for
+            event_type: The type of event to listen for, or a pattern such as
+                'Payment*' or '*.Failed' (see routing.py). Streams created later
+                that match a pattern are picked up automatically.
             callback: Function to call when event is received
             consumer_group: Consumer group name (for load balancing)
         """
         print(f"📝 New subscription: {callback.__qualname__} is listening for '{event_type}' in group '{consumer_group}'")
         
         # Store subscriber
-        if event_type not in self._subscribers:
-            self._subscribers[event_type] = []
-        self._subscribers[event_type].append(callback)
+        with self._lock:
+            if consumer_group not in self._subscribers:
+                self._subscribers[consumer_group] = TopicRouter()
+        self._subscribers[consumer_group].add(event_type, callback)
+        
+        if is_pattern(event_type):
+            with self._lock:
+                self._patterns.append((event_type, consumer_group))
+            self._discover_streams()
+            self._start_discovery()
+        else:
+            self._ensure_consumer(event_type, consumer_group)
+    
+    def _ensure_consumer(self, event_type: str, consumer_group: str):
+        """Create the consumer group and start its consumer thread once per stream."""
+        thread_key = f"{event_type}:{consumer_group}"
+        with self._lock:
+            if thread_key in self._consumer_threads:
+                return
+            # Reserve the key so concurrent discovery doesn't start a second thread
+            self._consumer_threads[thread_key] = None
+            if len(self._consumer_threads) > self._consumer_pool.max_connections:
+                print(f"⚠️  {len(self._consumer_threads)} consumer threads share {self._consumer_pool.max_connections} "
+                      f"consumer connections; raise consumer_pool_size to avoid pool waits")
+        
+        # Announce the member before its first XREADGROUP so rebalancing
+        # members never see it without a heartbeat
+        if self.consumer_name:
+            self._send_heartbeat(consumer_group)
         
         # Create consumer group if it doesn't exist
         stream_key = f"events:{event_type}"
         try:
             self.redis_client.xgroup_create(stream_key, consumer_group, id='0', mkstream=True)
+            self._register_stream(stream_key)
             print(f"  ✅ Created consumer group '{consumer_group}' for stream '{stream_key}'")
         except ResponseError as e:
             if 'BUSYGROUP' not in str(e):
                 print(f"  ⚠️  Error creating consumer group: {e}")
         
-        # Start consumer thread if not already running for this event type
-        thread_key = f"{event_type}:{consumer_group}"
-        if thread_key not in self._consumer_threads:
-            thread = threading.Thread(
-                target=self._consume_events,
-                args=(event_type, consumer_group),
+        # Start consumer thread for this event type
+        thread = threading.Thread(
+            target=self._consume_events,
+            args=(event_type, consumer_group),
+            daemon=True,
+            name=f"Consumer-{thread_key}"
+        )
+        thread.start()
+        self._consumer_threads[thread_key] = thread
+    
+    def _discover_streams(self):
+        """Start consumers for existing streams matched by a pattern subscription."""
+        with self._lock:
+            patterns = list(self._patterns)
+        if not patterns:
+            return
+        
+        for stream_key in self.redis_client.smembers(self.stream_registry_key):
+            event_type = stream_key[len("events:"):]
+            for pattern, consumer_group in patterns:
+                if topic_matches(pattern, event_type):
+                    self._ensure_consumer(event_type, consumer_group)
+    
+    def _register_stream(self, stream_key: str):
+        if stream_key not in self._registered_streams:
+            self.redis_client.sadd(self.stream_registry_key, stream_key)
+            self._registered_streams.add(stream_key)
+    
+    def _start_discovery(self):
+        with self._lock:
+            if self._discovery_thread is not None:
+                return
+            self._discovery_thread = threading.Thread(
+                target=self._discovery_loop,
                 daemon=True,
-                name=f"Consumer-{thread_key}"
+                name="StreamDiscovery"
             )
-            thread.start()
-            self._consumer_threads[thread_key] = thread
+        self._discovery_thread.start()
+    
+    def _discovery_loop(self):
+        """Background thread that picks up new streams matching a pattern."""
+        while self._running:
+            time.sleep(self.discovery_interval)
+            try:
+                self._discover_streams()
+            except Exception as e:
+                print(f"❌ Error discovering streams: {e}")
     
     def publish(self, event_type: str, data: Any, event_id: Optional[str] = None):
         """
@@ -86,16 +405,15 @@ class RedisEventBroker:
             event_type: The type of event
             data: Event data (will be serialized to JSON)
             event_id: Optional custom event ID (default: auto-generated)
+        
+        Returns:
+            The stream ID, or in outbox mode the event's dedup ID
+            (the stream ID is only assigned once the relay sends it)
         """
         stream_key = f"events:{event_type}"
         
         # Serialize data to JSON
-        if is_dataclass(data):
-            event_data = asdict(data)
-        elif isinstance(data, dict):
-            event_data = data
-        else:
-            event_data = {"data": str(data)}
+        event_data = serialize_event(data)
         
         # Convert all values to strings for Redis
         redis_data = {
@@ -103,11 +421,35 @@ class RedisEventBroker:
             "payload": json.dumps(event_data, default=str)
         }
         
-        # Publish to Redis Stream
-        if event_id:
-            stream_id = self.redis_client.xadd(stream_key, redis_data, id=event_id)
-        else:
-            stream_id = self.redis_client.xadd(stream_key, redis_data)
+        if self._outbox is not None:
+            dedup_id = uuid.uuid4().hex
+            redis_data["dedup_id"] = dedup_id
+            self._outbox.append(stream_key, redis_data, event_id)
+            self._relay.notify()
+            
+            print(f"\n📢 Queued event '{event_type}' in outbox (dedup ID: {dedup_id})")
+            print(f"   Data: {event_data}")
+            
+            return dedup_id
+        
+        # Publish to Redis Stream, failing fast while Redis is known to be down
+        self._breaker.check()
+        try:
+            if stream_key in self._registered_streams:
+                stream_id = self.redis_client.xadd(stream_key, redis_data, id=event_id or '*')
+            else:
+                # First event of this stream from this broker: register it in the same round trip
+                pipe = self.redis_client.pipeline(transaction=False)
+                pipe.xadd(stream_key, redis_data, id=event_id or '*')
+                pipe.sadd(self.stream_registry_key, stream_key)
+                stream_id = pipe.execute()[0]
+                self._registered_streams.add(stream_key)
+        except (RedisConnectionError, RedisTimeoutError) as e:
+            # A busy pool says nothing about Redis' health
+            if not isinstance(e, PoolExhaustedError):
+                self._breaker.record_failure()
+            raise
+        self._breaker.record_success()
         
         print(f"\n📢 Published event '{event_type}' to Redis Stream (ID: {stream_id})")
         print(f"   Data: {event_data}")
@@ -119,29 +461,67 @@ class RedisEventBroker:
         Background thread that consumes events from Redis Stream.
         """
         stream_key = f"events:{event_type}"
-        consumer_name = f"consumer_{threading.get_ident()}"
+        consumer_name = self.consumer_name or f"consumer_{threading.get_ident()}"
+        self._consumer_names[f"{event_type}:{consumer_group}"] = consumer_name
         
         print(f"🎧 Started consumer '{consumer_name}' for '{event_type}' in group '{consumer_group}'")
         
+        for event_id, event_data in self._handoff.pop(f"{event_type}:{consumer_group}", ()):
+            self._process_event(event_type, event_id, event_data, stream_key, consumer_group)
+        
+        # A stable consumer name may still own entries from a previous run:
+        # read its pending list ('0') first, then switch to new entries ('>').
+        read_id = '0' if self.consumer_name else '>'
+        backoff = ExponentialBackoff(cap=self.max_backoff)
+        next_rebalance = 0.0
+        
         while self._running:
             try:
+                self._breaker.check()
+                
+                # Work of dead members is processed here, not in the heartbeat thread
+                if self._rebalance_interval is not None and time.monotonic() >= next_rebalance:
+                    next_rebalance = time.monotonic() + self._rebalance_interval
+                    for event_id, event_data in self.rebalance(event_type, consumer_group,
+                                                               min_idle_ms=self._rebalance_min_idle_ms):
+                        if event_data is None:
+                            # Entry was trimmed from the stream; nothing left to process
+                            self._consumer_client.xack(stream_key, consumer_group, event_id)
+                            continue
+                        self._process_event(event_type, event_id, event_data, stream_key, consumer_group)
+                
                 # Read messages from the stream
-                messages = self.redis_client.xreadgroup(
+                messages = self._consumer_client.xreadgroup(
                     groupname=consumer_group,
                     consumername=consumer_name,
-                    streams={stream_key: '>'},
+                    streams={stream_key: read_id},
                     count=10,
                     block=1000  # Block for 1 second
                 )
                 
+                self._breaker.record_success()
+                backoff.reset()
+                
+                if read_id == '0' and not (messages and messages[0][1]):
+                    read_id = '>'
+                
                 if messages:
                     for stream, events in messages:
                         for event_id, event_data in events:
+                            if event_data is None:
+                                # Pending entry that was trimmed from the stream
+                                self._consumer_client.xack(stream_key, consumer_group, event_id)
+                                continue
                             self._process_event(event_type, event_id, event_data, stream_key, consumer_group)
                             
             except Exception as e:
-                print(f"❌ Error in consumer thread for '{event_type}': {e}")
-                time.sleep(1)  # Back off on error
+                if isinstance(e, (RedisConnectionError, RedisTimeoutError)) and not isinstance(
+                        e, (CircuitOpenError, PoolExhaustedError)):
+                    self._breaker.record_failure()
+                delay = backoff.next_delay()
+                if not isinstance(e, CircuitOpenError):
+                    print(f"❌ Error in consumer thread for '{event_type}', retrying in {delay:.2f}s: {e}")
+                time.sleep(delay)  # Back off on error
     
     def _process_event(self, event_type: str, event_id: str, event_data: Dict, stream_key: str, consumer_group: str):
         """Process a single event and acknowledge it."""
@@ -150,56 +530,156 @@ class RedisEventBroker:
             payload_json = event_data.get('payload', '{}')
             payload = json.loads(payload_json)
             
-            # Call all subscribers for this event type
-            if event_type in self._subscribers:
-                for callback in self._subscribers[event_type]:
-                    try:
-                        # Try to reconstruct the original object if possible
-                        callback(self._reconstruct_event(payload))
-                    except Exception as e:
-                        print(f"❌ Error calling callback {callback.__qualname__}: {e}")
+            # Outbox events may be relayed more than once. The first stream entry
+            # to claim the dedup_id handles it; copies are acked and skipped.
+            # A claim holding our own entry ID is a redelivery of that entry
+            # (e.g. after a crash before XACK) and is handled again.
+            dedup_id = event_data.get('dedup_id')
+            if dedup_id:
+                dedup_key = f"dedup:{stream_key}:{consumer_group}:{dedup_id}"
+                claimed = self._consumer_client.set(dedup_key, event_id, nx=True, ex=self.dedup_ttl)
+                if not claimed and self._consumer_client.get(dedup_key) != event_id:
+                    self._consumer_client.xack(stream_key, consumer_group, event_id)
+                    return
+            
+            # Call all subscribers of this group for this event type
+            context = HandlerContext(event_type, event_id, consumer_group)
+            with self._dispatch_lock:
+                callbacks = self._subscribers[consumer_group].match(event_type)
+                self._dispatched[f"{event_type}:{consumer_group}"] = event_id
+            for callback in callbacks:
+                try:
+                    # Try to reconstruct the original object if possible
+                    self._pipeline.invoke(callback, self._reconstruct_event(payload), context)
+                except Exception as e:
+                    print(f"❌ Error calling callback {callback.__qualname__}: {e}")
             
             # Acknowledge the message
-            self.redis_client.xack(stream_key, consumer_group, event_id)
+            self._consumer_client.xack(stream_key, consumer_group, event_id)
             
         except Exception as e:
             print(f"❌ Error processing event {event_id}: {e}")
     
-    def _reconstruct_event(self, payload: Dict):
+    def isolate_handler(self, callback: Callable, context: HandlerContext) -> bool:
         """
-        Attempt to reconstruct the event object.
-        For now, returns a simple dict. Can be enhanced to reconstruct dataclass objects.
+        Move a slow handler to a consumer group of its own.
+        
+        The handler is removed from its group and re-subscribed in
+        '<group>.isolated.<handler>', created at the original group's
+        last-delivered-id. Entries this process already read but had not
+        dispatched yet are handed to the new consumer thread, so the handler
+        sees every event exactly once. It then has its own consumer thread
+        and no longer holds up the other subscribers of the stream.
+        
+        Isolation is per process: other processes consuming the same group
+        would keep calling the handler as well, so the handler would run twice.
+        It is therefore declined while another member of the group is active.
+        
+        Returns:
+            True if the handler was isolated
         """
-        # Import events to reconstruct objects
-        try:
-            from src.models.events import BidderRegistered, AuctionEnded, PaymentProcessed
-            from uuid import UUID
+        old_group = context.consumer_group
+        new_group = f"{old_group}.isolated.{handler_name(callback)}"
+        router = self._subscribers[old_group]
+        
+        topics = router.topics(callback)
+        event_types = {topic: self._isolated_event_types(topic, old_group) for topic in topics}
+        
+        others = self._active_peers(old_group, {t for types in event_types.values() for t in types})
+        if others:
+            print(f"⚠️  Not isolating {handler_name(callback)}: group '{old_group}' is shared with "
+                  f"{', '.join(sorted(others))}; isolation is per process")
+            return False
+        
+        # Consumer threads resolve callbacks under _dispatch_lock, so while it is
+        # held no entry can be dispatched or acked: the cursor and the undispatched
+        # pending entries are read consistently with the removal
+        start_ids = {}
+        with self._dispatch_lock:
+            router.remove(callback)
+            for types in event_types.values():
+                for event_type in types:
+                    if event_type not in start_ids:
+                        start_ids[event_type] = self._last_delivered_id(event_type, old_group)
+                        undispatched = self._undispatched(event_type, old_group, start_ids[event_type])
+                        if undispatched:
+                            self._handoff[f"{event_type}:{new_group}"] = undispatched
+        
+        for topic in topics:
+            for event_type in event_types[topic]:
+                try:
+                    self.redis_client.xgroup_create(f"events:{event_type}", new_group,
+                                                    id=start_ids[event_type], mkstream=True)
+                except ResponseError as e:
+                    if 'BUSYGROUP' not in str(e):
+                        raise
             
-            # Try to match and reconstruct
-            if 'bidder_id' in payload and 'credit_card_token' in payload:
-                return BidderRegistered(
-                    bidder_id=UUID(payload['bidder_id']),
-                    name=payload['name'],
-                    credit_card_token=payload['credit_card_token']
-                )
-            elif 'auction_id' in payload and 'winning_bidder_id' in payload:
-                return AuctionEnded(
-                    auction_id=UUID(payload['auction_id']),
-                    winning_bidder_id=UUID(payload['winning_bidder_id']),
-                    winning_price=float(payload['winning_price'])
-                )
-            elif 'auction_id' in payload and 'status' in payload:
-                return PaymentProcessed(
-                    auction_id=UUID(payload['auction_id']),
-                    bidder_id=UUID(payload['bidder_id']),
-                    amount=float(payload['amount']),
-                    status=payload['status']
-                )
-        except Exception:
-            pass
+            self.subscribe(topic, callback, consumer_group=new_group)
+        return True
+    
+    def _isolated_event_types(self, topic: str, consumer_group: str) -> List[str]:
+        if not is_pattern(topic):
+            return [topic]
+        return [thread_key.rsplit(':', 1)[0] for thread_key in list(self._consumer_threads)
+                if thread_key.endswith(f":{consumer_group}")
+                and topic_matches(topic, thread_key.rsplit(':', 1)[0])]
+    
+    def _active_peers(self, consumer_group: str, event_types) -> set:
+        """Members of the group in other processes that read within the heartbeat TTL."""
+        own = set(self._consumer_names.values())
+        peers = set()
+        for event_type in event_types:
+            try:
+                consumers = self.redis_client.xinfo_consumers(f"events:{event_type}", consumer_group)
+            except ResponseError:
+                continue
+            for consumer in consumers:
+                if consumer['name'] not in own and consumer['idle'] < self._heartbeat_ttl * 1000:
+                    peers.add(consumer['name'])
+        return peers
+    
+    def _undispatched(self, event_type: str, consumer_group: str, last_delivered_id: str) -> List:
+        """
+        Entries this process's consumer read but has not dispatched yet.
         
-        # Fallback to dict
-        return payload
+        They are pending for our consumer and newer than the last entry whose
+        callbacks were resolved. Older pending entries (e.g. stuck ones of
+        consumers from earlier runs) are left alone.
+        """
+        thread_key = f"{event_type}:{consumer_group}"
+        consumer_name = self._consumer_names.get(thread_key)
+        if consumer_name is None or last_delivered_id == '$':
+            return []
+        stream_key = f"events:{event_type}"
+        dispatched = self._dispatched.get(thread_key)
+        
+        message_ids, start = [], '-'
+        while True:
+            page = self.redis_client.xpending_range(stream_key, consumer_group, min=start, max=last_delivered_id,
+                                                    count=1000, consumername=consumer_name)
+            message_ids.extend(entry['message_id'] for entry in page)
+            if len(page) < 1000:
+                break
+            ms, seq = _stream_id_key(page[-1]['message_id'])
+            start = f"{ms}-{seq + 1}"
+        if dispatched is not None:
+            message_ids = [message_id for message_id in message_ids
+                           if _stream_id_key(message_id) > _stream_id_key(dispatched)]
+        
+        entries = []
+        for message_id in message_ids:
+            entries.extend(self.redis_client.xrange(stream_key, min=message_id, max=message_id))
+        return entries
+    
+    def _last_delivered_id(self, event_type: str, consumer_group: str) -> str:
+        for group in self.redis_client.xinfo_groups(f"events:{event_type}"):
+            if group['name'] == consumer_group:
+                return group['last-delivered-id']
+        return '$'
+    
+    def _reconstruct_event(self, payload: Dict):
+        """Attempt to reconstruct the event object (see serialization.reconstruct_event)."""
+        return reconstruct_event(payload)
     
     def get_event_history(self, event_type: str, count: int = 10) -> List[Dict]:
         """
@@ -248,6 +728,13 @@ class RedisEventBroker:
         try:
             messages = self.redis_client.xrange(stream_key, min=from_id, count=count)
             
+            # Every subscriber of the event type, whatever its group, gets the replay once
+            callbacks = []
+            for router in list(self._subscribers.values()):
+                for callback in router.match(event_type):
+                    if callback not in callbacks:
+                        callbacks.append(callback)
+            
             replayed = 0
             for event_id, event_data in messages:
                 payload = json.loads(event_data.get('payload', '{}'))
@@ -255,12 +742,12 @@ class RedisEventBroker:
                 print(f"  📼 Replaying event {event_id}: {payload}")
                 
                 # Call subscribers
-                if event_type in self._subscribers:
-                    for callback in self._subscribers[event_type]:
-                        try:
-                            callback(self._reconstruct_event(payload))
-                        except Exception as e:
-                            print(f"❌ Error in replay callback {callback.__qualname__}: {e}")
+                context = HandlerContext(event_type, event_id, replay=True)
+                for callback in callbacks:
+                    try:
+                        self._pipeline.invoke(callback, self._reconstruct_event(payload), context)
+                    except Exception as e:
+                        print(f"❌ Error in replay callback {callback.__qualname__}: {e}")
                 
                 replayed += 1
             
@@ -269,6 +756,14 @@ class RedisEventBroker:
         except Exception as e:
             print(f"❌ Error replaying events: {e}")
     
+    def get_pool_stats(self) -> Dict:
+        """Connection pool wait times and circuit breaker state."""
+        return {
+            'publisher': self._publisher_pool.metrics.snapshot(),
+            'consumer': self._consumer_pool.metrics.snapshot(),
+            'circuit': self._breaker.state
+        }
+    
     def get_stream_info(self, event_type: str) -> Dict:
         """Get information about a stream."""
         stream_key = f"events:{event_type}"
@@ -284,16 +779,60 @@ class RedisEventBroker:
         except ResponseError:
             return {'length': 0, 'error': 'Stream does not exist'}
     
+    def drain(self, timeout: float = 30.0):
+        """
+        Stop reading new events and wait for in-flight batches to be acknowledged.
+        
+        Used for graceful shutdown (e.g. on SIGTERM): no new entries are read,
+        the batch each consumer thread is working on is finished and acked, and
+        the heartbeat and name claim are withdrawn so other members don't wait
+        for them to expire.
+        """
+        print(f"\n🚰 Draining Redis Event Broker (timeout {timeout}s)...")
+        self._running = False
+        self._heartbeat_stop.set()
+        
+        deadline = time.monotonic() + timeout
+        for thread in list(self._consumer_threads.values()):
+            if thread is not None:
+                thread.join(timeout=max(0.0, deadline - time.monotonic()))
+        if self._heartbeat_thread is not None:
+            self._heartbeat_thread.join(timeout=max(0.0, deadline - time.monotonic()))
+        
+        if self.consumer_name:
+            try:
+                keys = {self._heartbeat_key(thread_key.rsplit(':', 1)[1], self.consumer_name)
+                        for thread_key in list(self._consumer_threads)}
+                if keys:
+                    self.redis_client.delete(*keys)
+                if self._name_token is not None and \
+                        self.redis_client.get(self._name_claim_key(self.consumer_name)) == self._name_token:
+                    self.redis_client.delete(self._name_claim_key(self.consumer_name))
+            except Exception as e:
+                print(f"⚠️  Could not remove heartbeat: {e}")
+    
     def close(self):
         """Close the broker and cleanup resources."""
         print("\n🔌 Closing Redis Event Broker...")
         self._running = False
+        self._heartbeat_stop.set()
+        
+        # Give the relay a chance to ship what is queued; the rest stays on disk
+        if self._relay is not None:
+            if not self._relay.flush(timeout=5):
+                print(f"⚠️  {self._outbox.pending()} events left in outbox, they will be sent on next start")
+            self._relay.stop()
+            self._outbox.close()
         
         # Wait for consumer threads to finish
-        for thread in self._consumer_threads.values():
-            thread.join(timeout=2)
+        for thread in list(self._consumer_threads.values()):
+            if thread is not None:
+                thread.join(timeout=2)
         
+        self._consumer_client.close()
         self.redis_client.close()
+        self._consumer_pool.disconnect()
+        self._publisher_pool.disconnect()
         print("✅ Redis Event Broker closed.")
 
 
@@ -0,0 +1,82 @@
+# resilience.py
+"""
+Retry and fast-fail helpers for the Redis broker.
+
+- ExponentialBackoff: delays for reconnect loops, doubled after every
+  failure up to a cap, with "full jitter" so that many consumer threads
+  don't hammer Redis in lock-step when it comes back
+- CircuitBreaker: after `failure_threshold` consecutive connection failures
+  calls fail immediately with CircuitOpenError instead of each waiting for
+  a connect timeout; after `reset_timeout` calls are let through again and
+  the first success closes the circuit
+"""
+
+import random
+import threading
+import time
+from redis.exceptions import ConnectionError as RedisConnectionError
+
+
+class CircuitOpenError(RedisConnectionError):
+    """Raised instead of calling Redis while the circuit is open."""
+
+
+class ExponentialBackoff:
+    """Full-jitter exponential backoff: a random delay in [0, min(cap, base * 2^n)]."""
+
+    def __init__(self, base: float = 0.1, cap: float = 30.0):
+        self.base = base
+        self.cap = cap
+        self.attempts = 0
+
+    def next_delay(self) -> float:
+        delay = random.uniform(0, min(self.cap, self.base * (2 ** self.attempts)))
+        self.attempts += 1
+        return delay
+
+    def reset(self):
+        self.attempts = 0
+
+
+class CircuitBreaker:
+    """
+    Tracks consecutive connection failures shared by every user of a client.
+
+    States: 'closed' (calls go through), 'open' (calls fail fast) and
+    'half_open' (reset_timeout elapsed, calls go through as probes).
+    """
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 10.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._failures = 0
+        self._opened_at = None
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        if self._opened_at is None:
+            return 'closed'
+        if time.monotonic() - self._opened_at >= self.reset_timeout:
+            return 'half_open'
+        return 'open'
+
+    def check(self):
+        """Raise CircuitOpenError if calls should not be attempted right now."""
+        if self.state == 'open':
+            raise CircuitOpenError("Redis circuit is open, failing fast")
+
+    def record_success(self):
+        with self._lock:
+            if self._opened_at is not None:
+                print("✅ Redis reachable again, circuit closed")
+            self._failures = 0
+            self._opened_at = None
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._failures >= self.failure_threshold and self.state != 'open':
+                if self._opened_at is None:
+                    print(f"🔌 Redis circuit opened after {self._failures} consecutive failures")
+                self._opened_at = time.monotonic()
@@ -0,0 +1,165 @@
+# routing.py
+"""
+Topic routing for the event brokers.
+
+Subscriptions are either exact event types ("PaymentProcessed") or patterns.
+Topics are split into segments on '.':
+
+- '*' inside a segment matches any characters within that segment
+  ("Payment*" matches "PaymentProcessed", "*.Failed" matches "Payment.Failed")
+- '#' as a whole segment matches zero or more segments ("Payment.#")
+
+Patterns are compiled into a trie once, at subscribe time. The callbacks
+resolved for a concrete event type are cached, so dispatch after the first
+event of a type is a single dict lookup.
+"""
+
+import re
+import threading
+from functools import lru_cache
+from itertools import count
+from typing import Callable, Dict, List, Tuple
+
+WILDCARDS = ('*', '#')
+
+
+def is_pattern(topic: str) -> bool:
+    """True if `topic` contains wildcards and is not a plain event type."""
+    return any(wildcard in topic for wildcard in WILDCARDS)
+
+
+def _compile_segment(segment: str):
+    return re.compile('.*'.join(re.escape(part) for part in segment.split('*')) + r'\Z')
+
+
+class _Node:
+    __slots__ = ('literal', 'globs', 'multi', 'callbacks')
+
+    def __init__(self):
+        self.literal: Dict[str, '_Node'] = {}
+        self.globs: List[Tuple[str, 're.Pattern', '_Node']] = []
+        self.multi: '_Node' = None
+        # (registration order, callback)
+        self.callbacks: List[Tuple[int, Callable]] = []
+
+    def child(self, segment: str) -> '_Node':
+        if segment == '#':
+            if self.multi is None:
+                self.multi = _Node()
+            return self.multi
+        if '*' in segment:
+            for glob, _, node in self.globs:
+                if glob == segment:
+                    return node
+            node = _Node()
+            self.globs.append((segment, _compile_segment(segment), node))
+            return node
+        return self.literal.setdefault(segment, _Node())
+
+
+class TopicRouter:
+    """Routing trie from exact or wildcard topics to callbacks."""
+
+    def __init__(self):
+        self._root = _Node()
+        self._order = count()
+        self._lock = threading.Lock()
+        self._cache: Dict[str, Tuple[Callable, ...]] = {}
+
+    def add(self, topic: str, callback: Callable):
+        """Register `callback` for an exact event type or a pattern."""
+        with self._lock:
+            node = self._root
+            for segment in topic.split('.'):
+                node = node.child(segment)
+            node.callbacks.append((next(self._order), callback))
+            self._cache = {}
+
+    def remove(self, callback: Callable) -> List[str]:
+        """
+        Unregister `callback` everywhere.
+
+        Returns:
+            The topics it was registered under
+        """
+        removed = []
+        with self._lock:
+            self._remove(self._root, [], callback, removed)
+            self._cache = {}
+        return removed
+
+    def topics(self, callback: Callable) -> List[str]:
+        """Topics `callback` is registered under."""
+        found = []
+        with self._lock:
+            self._find(self._root, [], callback, found)
+        return found
+
+    def _find(self, node: _Node, path: List[str], callback: Callable, found: List[str]):
+        if any(cb == callback for _, cb in node.callbacks):
+            found.append('.'.join(path))
+        for segment, child in node.literal.items():
+            self._find(child, path + [segment], callback, found)
+        for segment, _, child in node.globs:
+            self._find(child, path + [segment], callback, found)
+        if node.multi is not None:
+            self._find(node.multi, path + ['#'], callback, found)
+
+    def _remove(self, node: _Node, path: List[str], callback: Callable, removed: List[str]):
+        kept = [(order, cb) for order, cb in node.callbacks if cb != callback]
+        if len(kept) != len(node.callbacks):
+            removed.append('.'.join(path))
+            node.callbacks = kept
+        for segment, child in node.literal.items():
+            self._remove(child, path + [segment], callback, removed)
+        for segment, _, child in node.globs:
+            self._remove(child, path + [segment], callback, removed)
+        if node.multi is not None:
+            self._remove(node.multi, path + ['#'], callback, removed)
+
+    def match(self, event_type: str) -> Tuple[Callable, ...]:
+        """Callbacks for a concrete event type, in subscription order."""
+        cache = self._cache
+        callbacks = cache.get(event_type)
+        if callbacks is None:
+            matched = {}
+            for node in self._match(self._root, event_type.split('.'), 0, set()):
+                for order, callback in node.callbacks:
+                    matched[order] = callback
+            callbacks = tuple(matched[order] for order in sorted(matched))
+            cache[event_type] = callbacks
+        return callbacks
+
+    def _match(self, node: _Node, segments: List[str], i: int, seen: set):
+        # Several '#' can reach the same (node, position) through different
+        # splits of the segments; visiting it once keeps matching polynomial
+        state = (id(node), i)
+        if state in seen:
+            return
+        seen.add(state)
+        if node.multi is not None:
+            # '#' swallows zero or more of the remaining segments
+            for j in range(i, len(segments) + 1):
+                yield from self._match(node.multi, segments, j, seen)
+        if i == len(segments):
+            yield node
+            return
+        segment = segments[i]
+        child = node.literal.get(segment)
+        if child is not None:
+            yield from self._match(child, segments, i + 1, seen)
+        for _, regex, child in node.globs:
+            if regex.match(segment):
+                yield from self._match(child, segments, i + 1, seen)
+
+
+@lru_cache(maxsize=256)
+def _pattern_router(pattern: str) -> TopicRouter:
+    router = TopicRouter()
+    router.add(pattern, topic_matches)
+    return router
+
+
+def topic_matches(pattern: str, event_type: str) -> bool:
+    """True if the concrete `event_type` is matched by `pattern`."""
+    return bool(_pattern_router(pattern).match(event_type))
@@ -0,0 +1,55 @@
+# serialization.py
+"""
+Conversion between event objects and the JSON payloads stored by the
+persistent brokers (Redis Streams and the file-backed event log).
+"""
+
+from dataclasses import asdict, is_dataclass
+from typing import Any, Dict
+
+
+def serialize_event(data: Any) -> Dict:
+    """Turn event data into a JSON-serializable dict."""
+    if is_dataclass(data):
+        return asdict(data)
+    elif isinstance(data, dict):
+        return data
+    else:
+        return {"data": str(data)}
+
+
+def reconstruct_event(payload: Dict):
+    """
+    Attempt to reconstruct the event object.
+    Falls back to the plain dict when the payload matches no known event.
+    """
+    # Import events to reconstruct objects
+    try:
+        from src.models.events import BidderRegistered, AuctionEnded, PaymentProcessed
+        from uuid import UUID
+        
+        # Try to match and reconstruct
+        if 'bidder_id' in payload and 'credit_card_token' in payload:
+            return BidderRegistered(
+                bidder_id=UUID(payload['bidder_id']),
+                name=payload['name'],
+                credit_card_token=payload['credit_card_token']
+            )
+        elif 'auction_id' in payload and 'winning_bidder_id' in payload:
+            return AuctionEnded(
+                auction_id=UUID(payload['auction_id']),
+                winning_bidder_id=UUID(payload['winning_bidder_id']),
+                winning_price=float(payload['winning_price'])
+            )
+        elif 'auction_id' in payload and 'status' in payload:
+            return PaymentProcessed(
+                auction_id=UUID(payload['auction_id']),
+                bidder_id=UUID(payload['bidder_id']),
+                amount=float(payload['amount']),
+                status=payload['status']
+            )
+    except Exception:
+        pass
+    
+    # Fallback to dict
+    return payload
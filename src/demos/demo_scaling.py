@@ -0,0 +1,115 @@
+# demo_scaling.py
+"""
+Benchmark: consumer throughput with 1..N worker processes.
+
+Every worker process joins one consumer group and runs a CPU-bound handler,
+the case where threads inside a single process are capped by the GIL. For
+each process count the benchmark publishes a fixed batch of events and
+measures how fast the group works through it.
+
+Runs against the local docker-compose Redis:
+
+    docker-compose up -d
+    python run_demo_scaling.py --max-processes 4 --events 2000 --work-ms 2
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import time
+from typing import List, Optional
+
+STREAM = "ScalingBenchmark"
+GROUP = "benchmark"
+READY_KEY = "benchmark:ready"
+DONE_KEY = "benchmark:done"
+
+
+def _busy(work_ms: float):
+    """Burn CPU (holding the GIL) for `work_ms` milliseconds."""
+    deadline = time.perf_counter() + work_ms / 1000
+    while time.perf_counter() < deadline:
+        pass
+
+
+def _bench_worker(work_ms: float):
+    """Entry point of a benchmark worker process."""
+    from src.brokers.redis_event_broker import broker
+
+    broker.set_consumer_name(f"benchmark-{os.getpid()}")
+
+    def handle(event):
+        _busy(work_ms)
+        broker.redis_client.incr(DONE_KEY)
+
+    broker.subscribe(STREAM, handle, consumer_group=GROUP)
+    broker.redis_client.incr(READY_KEY)
+    while True:
+        time.sleep(3600)
+
+
+def _reset(redis_client):
+    redis_client.delete(f"events:{STREAM}", READY_KEY, DONE_KEY)
+
+
+def run_once(redis_client, processes: int, events: int, work_ms: float, timeout: float = 300.0) -> float:
+    """Events/s processed by `processes` workers; 0.0 if they didn't finish in time."""
+    _reset(redis_client)
+    context = multiprocessing.get_context('spawn')
+    workers = [context.Process(target=_bench_worker, args=(work_ms,), daemon=True) for _ in range(processes)]
+    for worker in workers:
+        worker.start()
+
+    try:
+        while int(redis_client.get(READY_KEY) or 0) < processes:
+            time.sleep(0.05)
+
+        start = time.perf_counter()
+        pipe = redis_client.pipeline(transaction=False)
+        for i in range(events):
+            pipe.xadd(f"events:{STREAM}", {"event_type": STREAM, "payload": json.dumps({"i": i})})
+        pipe.execute()
+
+        deadline = start + timeout
+        while int(redis_client.get(DONE_KEY) or 0) < events:
+            if time.perf_counter() >= deadline:
+                return 0.0
+            time.sleep(0.01)
+        return events / (time.perf_counter() - start)
+    finally:
+        for worker in workers:
+            worker.terminate()
+        for worker in workers:
+            worker.join()
+        _reset(redis_client)
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Measure consumer throughput for 1..N worker processes.")
+    parser.add_argument('--max-processes', type=int, default=os.cpu_count() or 1,
+                        help="Largest number of worker processes (default: CPU count)")
+    parser.add_argument('--events', type=int, default=2000, help="Events published per run")
+    parser.add_argument('--work-ms', type=float, default=2.0, help="CPU time each event costs its handler")
+    args = parser.parse_args(argv)
+
+    import redis
+    redis_client = redis.Redis(host='localhost', port=6379, db=0, decode_responses=True)
+    redis_client.ping()
+
+    print("=== WORKER SCALING BENCHMARK ===\n")
+    print(f"{args.events} events, {args.work_ms}ms of CPU per event\n")
+    print(f"{'processes':>9}  {'events/s':>10}  {'speedup':>7}")
+
+    baseline = None
+    for processes in range(1, args.max_processes + 1):
+        rate = run_once(redis_client, processes, args.events, args.work_ms)
+        if rate == 0.0:
+            print(f"{processes:>9}  {'timeout':>10}")
+            continue
+        baseline = baseline or rate
+        print(f"{processes:>9}  {rate:>10.0f}  {rate / baseline:>6.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,4 @@
+# Workers package
+from .runner import WorkerRunner, SERVICES
+
+__all__ = ['WorkerRunner', 'SERVICES']
@@ -0,0 +1,202 @@
+# runner.py
+"""
+Multi-process worker runner for Redis-backed services.
+
+Every consumer normally runs as a thread inside one Python process, so
+CPU-bound handlers are capped by the GIL. This runner launches N processes
+for one service; each process joins the service's Redis consumer group under
+a unique, stable consumer name, so Redis spreads the stream across them.
+
+    python run_workers.py PaymentService --processes 4
+
+Each worker:
+- uses the consumer name '<service>-<host>-<index>', so a restarted worker
+  takes over the pending entries it owned before it died. Names are claimed
+  in Redis; if another runner (or a container reusing the hostname) holds
+  the name, the worker takes the next free index
+- sends heartbeats and claims pending entries of members whose heartbeat expired
+- drains on SIGTERM/SIGINT: stops reading, finishes and acks its in-flight batch
+"""
+
+import argparse
+import multiprocessing
+import os
+import signal
+import socket
+import threading
+import time
+import uuid
+from itertools import count
+from typing import Dict, List, Optional
+from src.brokers.resilience import ExponentialBackoff
+
+# Services that consume events and can be scaled out
+SERVICES = ['PaymentService', 'NotificationService']
+
+
+def consumer_name_for(service_name: str, index: int) -> str:
+    """Stable consumer name for worker `index` of a service on this host."""
+    return f"{service_name}-{socket.gethostname()}-{index}"
+
+
+def _run_worker(service_name: str, index: int, token: str, heartbeat_interval: float,
+                heartbeat_ttl: float, min_idle_ms: int, drain_timeout: float):
+    """Entry point of a worker process."""
+    stop = threading.Event()
+    signal.signal(signal.SIGTERM, lambda signum, frame: stop.set())
+    signal.signal(signal.SIGINT, lambda signum, frame: stop.set())
+
+    # Imported here so each process opens its own Redis connection
+    from src.brokers.redis_event_broker import broker
+    from src.services import services_redis
+
+    for candidate in count(index):
+        consumer_name = consumer_name_for(service_name, candidate)
+        if broker.claim_consumer_name(consumer_name, token, ttl=heartbeat_ttl):
+            break
+        print(f"⚠️  Consumer name '{consumer_name}' is held by another process, trying the next index")
+
+    # Services subscribe themselves on construction
+    service = getattr(services_redis, service_name)()
+    broker.start_heartbeat(interval=heartbeat_interval, ttl=heartbeat_ttl, min_idle_ms=min_idle_ms)
+    print(f"👷 Worker '{consumer_name}' (pid {os.getpid()}) is running {type(service).__name__}")
+
+    stop.wait()
+
+    broker.drain(timeout=drain_timeout)
+    broker.close()
+    print(f"👋 Worker '{consumer_name}' stopped.")
+
+
+class WorkerRunner:
+    """
+    Launches and supervises N worker processes for one service.
+
+    Workers that exit unexpectedly are restarted under the same index, and
+    therefore the same consumer name, with exponential backoff while they keep
+    crashing (e.g. Redis is down at startup). On SIGTERM/SIGINT the runner forwards
+    SIGTERM to every worker and waits for them to drain.
+    """
+
+    def __init__(self, service_name: str, processes: int = 2, heartbeat_interval: float = 2.0,
+                 heartbeat_ttl: float = 10.0, min_idle_ms: int = 30000, drain_timeout: float = 30.0,
+                 max_restart_delay: float = 60.0, stable_after: float = 60.0):
+        if service_name not in SERVICES:
+            raise ValueError(f"Unknown service '{service_name}'. Choose from: {', '.join(SERVICES)}")
+        if processes < 1:
+            raise ValueError("processes must be at least 1")
+
+        self.service_name = service_name
+        self.processes = processes
+        self.heartbeat_interval = heartbeat_interval
+        self.heartbeat_ttl = heartbeat_ttl
+        self.min_idle_ms = min_idle_ms
+        self.drain_timeout = drain_timeout
+        self.max_restart_delay = max_restart_delay
+        # A worker that ran this long before exiting restarts without delay
+        self.stable_after = stable_after
+
+        # 'spawn' gives every worker a clean interpreter and its own connections
+        self._context = multiprocessing.get_context('spawn')
+        self._workers: Dict[int, multiprocessing.Process] = {}
+        self._stopping = threading.Event()
+        # Per index: the token of its name claim, kept across restarts, and restart state
+        self._tokens: Dict[int, str] = {}
+        self._started_at: Dict[int, float] = {}
+        self._restart_backoff: Dict[int, ExponentialBackoff] = {}
+        self._restart_at: Dict[int, float] = {}
+
+    def _start_worker(self, index: int):
+        token = self._tokens.setdefault(index, f"{os.getpid()}-{uuid.uuid4().hex}")
+        process = self._context.Process(
+            target=_run_worker,
+            args=(self.service_name, index, token, self.heartbeat_interval, self.heartbeat_ttl,
+                  self.min_idle_ms, self.drain_timeout),
+            name=consumer_name_for(self.service_name, index)
+        )
+        process.start()
+        self._workers[index] = process
+        self._started_at[index] = time.monotonic()
+
+    def start(self):
+        """Start all worker processes."""
+        print(f"🚀 Starting {self.processes} worker(s) for {self.service_name}...")
+        for index in range(self.processes):
+            self._start_worker(index)
+
+    def supervise(self, poll_interval: float = 1.0):
+        """Restart crashed workers until stop() is called."""
+        while not self._stopping.wait(poll_interval):
+            now = time.monotonic()
+            for index, process in list(self._workers.items()):
+                if process.is_alive():
+                    continue
+                if index not in self._restart_at:
+                    backoff = self._restart_backoff.setdefault(
+                        index, ExponentialBackoff(base=1.0, cap=self.max_restart_delay))
+                    if now - self._started_at[index] >= self.stable_after:
+                        backoff.reset()
+                    delay = backoff.next_delay()
+                    self._restart_at[index] = now + delay
+                    print(f"⚠️  Worker {process.name} exited with code {process.exitcode}, "
+                          f"restarting in {delay:.1f}s...")
+                if now >= self._restart_at[index]:
+                    del self._restart_at[index]
+                    self._start_worker(index)
+
+    def stop(self):
+        """Ask every worker to drain, then wait for them to exit."""
+        self._stopping.set()
+        print(f"\n🛑 Stopping {len(self._workers)} worker(s)...")
+
+        for process in self._workers.values():
+            if process.is_alive():
+                process.terminate()  # SIGTERM -> graceful drain
+
+        deadline = time.monotonic() + self.drain_timeout + 5
+        for process in self._workers.values():
+            process.join(timeout=max(0.0, deadline - time.monotonic()))
+            if process.is_alive():
+                print(f"⚠️  Worker {process.name} did not drain in time, killing it")
+                process.kill()
+                process.join()
+        print("✅ All workers stopped.")
+
+    def run(self):
+        """Start the workers and supervise them until SIGTERM/SIGINT."""
+        signal.signal(signal.SIGTERM, lambda signum, frame: self._stopping.set())
+        signal.signal(signal.SIGINT, lambda signum, frame: self._stopping.set())
+
+        self.start()
+        self.supervise()
+        self.stop()
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Run a service across several worker processes.")
+    parser.add_argument('service', choices=SERVICES, help="Service to run")
+    parser.add_argument('-n', '--processes', type=int, default=os.cpu_count() or 1,
+                        help="Number of worker processes (default: CPU count)")
+    parser.add_argument('--heartbeat-interval', type=float, default=2.0,
+                        help="Seconds between heartbeats")
+    parser.add_argument('--heartbeat-ttl', type=float, default=10.0,
+                        help="Seconds after which a silent worker is considered dead")
+    parser.add_argument('--min-idle-ms', type=int, default=30000,
+                        help="Minimum idle time before a dead worker's pending events are claimed")
+    parser.add_argument('--drain-timeout', type=float, default=30.0,
+                        help="Seconds a worker may take to drain on shutdown")
+    args = parser.parse_args(argv)
+
+    runner = WorkerRunner(
+        args.service,
+        processes=args.processes,
+        heartbeat_interval=args.heartbeat_interval,
+        heartbeat_ttl=args.heartbeat_ttl,
+        min_idle_ms=args.min_idle_ms,
+        drain_timeout=args.drain_timeout
+    )
+    runner.run()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,212 @@
+# test_file_event_broker.py
+"""
+Behavior tests for the file-backed event log.
+
+Run from the repository root:
+
+    python -m unittest discover -s tests
+"""
+
+import json
+import os
+import shutil
+import tempfile
+import time
+import unittest
+
+from src.brokers.file_event_broker import RECORD_HEADER, EventLog, FileEventBroker
+
+
+def _payload(i: int) -> bytes:
+    return json.dumps({'i': i}).encode()
+
+
+def _values(records) -> list:
+    return [json.loads(bytes(payload))['i'] for _, _, payload in records]
+
+
+def _wait_until(condition, timeout: float = 5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() >= deadline:
+            raise AssertionError("condition not met in time")
+        time.sleep(0.01)
+
+
+class EventLogTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def open_log(self, **options) -> EventLog:
+        options.setdefault('segment_bytes', 256)
+        options.setdefault('index_interval', 64)
+        options.setdefault('fsync_policy', 'never')
+        log = EventLog(self.directory, **options)
+        self.addCleanup(log.close)
+        return log
+
+    def write(self, count: int, **options) -> EventLog:
+        log = self.open_log(**options)
+        for i in range(count):
+            self.assertEqual(log.append(_payload(i)), i)
+        return log
+
+    def last_segment_path(self) -> str:
+        return os.path.join(self.directory, sorted(n for n in os.listdir(self.directory) if n.endswith('.log'))[-1])
+
+
+class TestRecovery(EventLogTestCase):
+
+    def test_truncated_tail_is_dropped_on_open(self):
+        self.write(20).close()
+        path = self.last_segment_path()
+        size = os.path.getsize(path)
+        with open(path, 'r+b') as f:
+            f.truncate(size - 3)
+
+        log = self.open_log()
+        self.assertEqual(log.next_offset, 19)
+        self.assertEqual(_values(log.read(0)), list(range(19)))
+        self.assertLess(os.path.getsize(path), size - 3)
+
+        # Appends continue right after the last complete record
+        self.assertEqual(log.append(_payload(99)), 19)
+        self.assertEqual(_values(log.read(18)), [18, 99])
+
+    def test_corrupted_tail_is_dropped_on_open(self):
+        self.write(20).close()
+        path = self.last_segment_path()
+        with open(path, 'r+b') as f:
+            f.seek(-2, os.SEEK_END)
+            f.write(b'XX')
+
+        log = self.open_log()
+        self.assertEqual(log.next_offset, 19)
+        self.assertEqual(_values(log.read(0)), list(range(19)))
+
+    def test_header_only_tail_is_dropped_on_open(self):
+        self.write(5, segment_bytes=1024 * 1024).close()
+        path = self.last_segment_path()
+        with open(path, 'ab') as f:
+            f.write(RECORD_HEADER.pack(5, 100, 0, time.time()))
+
+        log = self.open_log(segment_bytes=1024 * 1024)
+        self.assertEqual(log.next_offset, 5)
+        self.assertEqual(_values(log.read(0)), list(range(5)))
+
+    def test_index_pointing_past_the_log_is_rewritten(self):
+        self.write(50, segment_bytes=1024 * 1024, index_interval=32).close()
+        path = self.last_segment_path()
+        index_path = path[:-len('.log')] + '.index'
+        with open(path, 'r+b') as f:
+            f.truncate(os.path.getsize(path) // 2)
+        with open(index_path, 'ab') as f:
+            f.write(b'\x01\x02\x03')  # torn index entry
+
+        log = self.open_log(segment_bytes=1024 * 1024, index_interval=32)
+        recovered = log.next_offset
+        self.assertGreater(recovered, 0)
+        self.assertLess(recovered, 50)
+        self.assertEqual(os.path.getsize(index_path) % 16, 0)
+        # Every offset is still reachable through the rewritten index
+        for start in range(recovered):
+            self.assertEqual(_values(log.read(start, 1)), [start])
+
+    def test_reopen_without_damage_keeps_everything(self):
+        self.write(40).close()
+        log = self.open_log()
+        self.assertEqual(log.next_offset, 40)
+        self.assertEqual(_values(log.read(0)), list(range(40)))
+
+
+class TestSegments(EventLogTestCase):
+
+    def test_rollover_names_segments_by_first_offset(self):
+        log = self.write(60)
+        self.assertGreater(log.segment_count, 2)
+        bases = sorted(int(name[:-4]) for name in os.listdir(self.directory) if name.endswith('.log'))
+        self.assertEqual(bases[0], 0)
+        for base in bases[1:]:
+            self.assertEqual(_values(log.read(base, 1)), [base])
+
+    def test_read_from_middle_segment(self):
+        log = self.write(60)
+        bases = sorted(int(name[:-4]) for name in os.listdir(self.directory) if name.endswith('.log'))
+        start = bases[1] + 1
+        self.assertEqual(_values(log.read(start)), list(range(start, 60)))
+
+    def test_read_with_count_crosses_segment_boundaries(self):
+        log = self.write(60)
+        bases = sorted(int(name[:-4]) for name in os.listdir(self.directory) if name.endswith('.log'))
+        start = bases[1] - 2
+        self.assertEqual(_values(log.read(start, 10)), list(range(start, start + 10)))
+
+    def test_read_after_reopen_uses_existing_segments(self):
+        self.write(60).close()
+        log = self.open_log()
+        self.assertGreater(log.segment_count, 2)
+        self.assertEqual(_values(log.read(33, 5)), [33, 34, 35, 36, 37])
+        self.assertEqual(log.append(_payload(60)), 60)
+
+
+class TestFileEventBroker(unittest.TestCase):
+
+    def setUp(self):
+        self.data_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.data_dir, ignore_errors=True)
+
+    def open_broker(self) -> FileEventBroker:
+        broker = FileEventBroker(self.data_dir, segment_bytes=256, index_interval=64, fsync_policy='never')
+        self.addCleanup(broker.close)
+        return broker
+
+    def test_replay_from_offset_in_middle_segment(self):
+        broker = self.open_broker()
+        for i in range(60):
+            broker.publish('Replayed', {'i': i})
+        self.assertGreater(broker._log('Replayed').segment_count, 2)
+
+        received = []
+        broker.subscribe('Replayed', received.append, consumer_group='replay')
+        _wait_until(lambda: len(received) == 60)
+
+        received.clear()
+        broker.replay_events('Replayed', from_id=25, count=20)
+        self.assertEqual([event['i'] for event in received], list(range(25, 45)))
+
+    def test_consumer_group_resumes_from_checkpoint(self):
+        broker = self.open_broker()
+        first = []
+        broker.subscribe('Checkpointed', first.append)
+        for i in range(5):
+            broker.publish('Checkpointed', {'i': i})
+        _wait_until(lambda: len(first) == 5)
+        broker.close()
+
+        broker = self.open_broker()
+        second = []
+        broker.subscribe('Checkpointed', second.append)
+        for i in range(5, 8):
+            broker.publish('Checkpointed', {'i': i})
+        _wait_until(lambda: len(second) == 3)
+        time.sleep(0.1)
+        self.assertEqual([event['i'] for event in second], [5, 6, 7])
+
+    def test_new_group_starts_from_the_beginning(self):
+        broker = self.open_broker()
+        for i in range(5):
+            broker.publish('Checkpointed', {'i': i})
+        received = []
+        broker.subscribe('Checkpointed', received.append, consumer_group='late')
+        _wait_until(lambda: len(received) == 5)
+        self.assertEqual([event['i'] for event in received], list(range(5)))
+
+
+if __name__ == '__main__':
+    unittest.main()